@@ -1,9 +1,23 @@
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, g
 from flask_cors import CORS
+from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+import jwt
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError, ProtocolError
 import os
+import sys
+import json
+import queue
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from functools import wraps
 from datetime import datetime
+from werkzeug.test import EnvironBuilder
 
 app = Flask(__name__)
 CORS(app)
@@ -13,10 +27,428 @@ AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://auth-service:84")
 ROOM_SERVICE_URL = os.getenv("ROOM_SERVICE_URL", "http://room-service:85")
 WEATHER_SERVICE_URL = os.getenv("WEATHER_SERVICE_URL", "http://weather-service:86")
 
-# Logging function
-def log_request(service, endpoint, method, status_code):
-    timestamp = datetime.utcnow().isoformat()
-    print(f"[{timestamp}] {method} /{service}{endpoint} -> {status_code}")
+# Upstream connection pool settings
+UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", "20"))
+UPSTREAM_CONNECT_TIMEOUT = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "2"))
+UPSTREAM_READ_TIMEOUT = float(os.getenv("UPSTREAM_READ_TIMEOUT", "10"))
+
+# Per-route (connect, read) timeouts, matched on the longest path prefix.
+# Override with UPSTREAM_ROUTE_TIMEOUTS="/api/booking/confirm=2:20,/health=1:2"
+ROUTE_TIMEOUTS = {
+    "/health": (1, 2),
+    "/api/auth/verify": (1, 3),
+    "/api/booking/check-availability": (UPSTREAM_CONNECT_TIMEOUT, 15),
+    "/api/booking/availability/bulk": (UPSTREAM_CONNECT_TIMEOUT, 15),
+    "/api/booking/confirm": (UPSTREAM_CONNECT_TIMEOUT, 15),
+}
+
+def parse_route_timeouts(value):
+    timeouts = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        path, _, pair = item.partition("=")
+        connect, _, read = pair.partition(":")
+        timeouts[path] = (float(connect), float(read or connect))
+    return timeouts
+
+ROUTE_TIMEOUTS.update(parse_route_timeouts(os.getenv("UPSTREAM_ROUTE_TIMEOUTS", "")))
+
+def create_session(pool_size):
+    """Create a keep-alive session with a bounded connection pool"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# One pooled session per upstream service
+UPSTREAMS = {
+    "auth": AUTH_SERVICE_URL,
+    "room": ROOM_SERVICE_URL,
+    "weather": WEATHER_SERVICE_URL
+}
+sessions = {name: create_session(UPSTREAM_POOL_SIZE) for name in UPSTREAMS}
+
+# Worker threads for fanning out independent upstream calls
+upstream_executor = ThreadPoolExecutor(max_workers=int(os.getenv("UPSTREAM_FANOUT_WORKERS", "16")))
+
+def get_service_name(service_url):
+    for name, url in UPSTREAMS.items():
+        if url == service_url:
+            return name
+    raise ValueError(f"Unknown upstream: {service_url}")
+
+def get_session(service_url):
+    return sessions[get_service_name(service_url)]
+
+def get_timeout(path):
+    matches = [prefix for prefix in ROUTE_TIMEOUTS if path.startswith(prefix)]
+    if not matches:
+        return (UPSTREAM_CONNECT_TIMEOUT, UPSTREAM_READ_TIMEOUT)
+    return ROUTE_TIMEOUTS[max(matches, key=len)]
+
+def pool_stats():
+    """Connection pool usage for every upstream session"""
+    stats = {}
+    for name, url in UPSTREAMS.items():
+        adapter = sessions[name].get_adapter(url)
+        pools = adapter.poolmanager.pools
+        connections = []
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections.append({
+                "host": f"{pool.host}:{pool.port}",
+                "opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "idle": sum(1 for conn in list(pool.pool.queue) if conn) if pool.pool else 0
+            })
+        stats[name] = {
+            "url": url,
+            "max_size": UPSTREAM_POOL_SIZE,
+            "pools": connections
+        }
+    return stats
+
+# Resilience settings
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "0.05"))
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MAX = float(os.getenv("RETRY_BUDGET_MAX", "10"))
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "50"))
+
+# Upstream statuses that count as failures for the breaker and may be retried
+FAILURE_STATUSES = {502, 503, 504}
+
+class CircuitBreaker:
+    """Closed -> open after repeated failures -> half-open single probe -> closed"""
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.probe_started = 0.0
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self.probing = False
+            # Half-open: let one probe through; a probe that never reported back expires
+            if self.probing and time.monotonic() - self.probe_started < self.reset_timeout:
+                return False
+            self.probing = True
+            self.probe_started = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.state = "closed"
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.probing = False
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self.lock:
+            stats = {"state": self.state, "failures": self.failures}
+            if self.state == "open":
+                stats["retry_in"] = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 2)
+            return stats
+
+class RetryBudget:
+    """Token bucket that caps retries at a fraction of first attempts"""
+
+    def __init__(self, ratio, max_tokens):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.lock = threading.Lock()
+        self.retries = 0
+        self.exhausted = 0
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.retries += 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def stats(self):
+        with self.lock:
+            return {
+                "tokens": round(self.tokens, 2),
+                "retries": self.retries,
+                "exhausted": self.exhausted
+            }
+
+class ConcurrencyLimiter:
+    """Non-blocking in-flight cap; callers over the limit are shed, not queued"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.shed = 0
+
+    def try_acquire(self):
+        with self.lock:
+            if self.in_flight >= self.limit:
+                self.shed += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def stats(self):
+        with self.lock:
+            return {"limit": self.limit, "in_flight": self.in_flight, "shed": self.shed}
+
+breakers = {name: CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT) for name in UPSTREAMS}
+limiters = {name: ConcurrencyLimiter(UPSTREAM_MAX_CONCURRENCY) for name in UPSTREAMS}
+retry_budget = RetryBudget(RETRY_BUDGET_RATIO, RETRY_BUDGET_MAX)
+
+def can_retry(method, attempt):
+    # Only idempotent GETs are retried, and only while the budget allows
+    return method == 'GET' and attempt < UPSTREAM_RETRIES and retry_budget.withdraw()
+
+def backoff_delay(attempt):
+    # Exponential backoff with full jitter
+    return random.uniform(0, RETRY_BACKOFF * 2 ** attempt)
+
+def resilience_stats():
+    return {
+        "breakers": {name: {**breakers[name].stats(), **limiters[name].stats()} for name in UPSTREAMS},
+        "retry_budget": retry_budget.stats()
+    }
+
+# Streaming proxy settings
+PROXY_STREAMING = os.getenv("PROXY_STREAMING", "true").lower() == "true"
+PROXY_MAX_BUFFER = int(os.getenv("PROXY_MAX_BUFFER", "65536"))
+PROXY_CHUNK_SIZE = int(os.getenv("PROXY_CHUNK_SIZE", "16384"))
+
+# Token verification cache settings
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_NEGATIVE_TTL = float(os.getenv("AUTH_CACHE_NEGATIVE_TTL", "5"))
+
+class TTLCache:
+    """Thread-safe LRU cache where every entry expires after its own TTL"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Bumped on every invalidation, so fills that raced one can be dropped
+        self.generation = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl, generation=None):
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self.entries[key] = (value, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.generation += 1
+
+    def delete_prefix(self, prefix):
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+            self.generation += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+# Verified tokens -> True (valid) or False (rejected by the auth service)
+token_cache = TTLCache(AUTH_CACHE_SIZE)
+
+def token_key(auth_header):
+    # The auth service accepts the token with or without the "Bearer " prefix
+    return auth_header.replace("Bearer ", "")
+
+# Optional local verification of the auth service's signed tokens (same AUTH_SIGNING_KEYS)
+def parse_signing_keys(value):
+    keys = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        kid, _, secret = item.partition(":")
+        if kid and secret:
+            keys[kid] = secret
+    return keys
+
+AUTH_SIGNING_KEYS = parse_signing_keys(os.getenv("AUTH_SIGNING_KEYS", ""))
+GATEWAY_VERIFY_TOKENS = os.getenv("GATEWAY_VERIFY_TOKENS", "false").lower() == "true" and bool(AUTH_SIGNING_KEYS)
+
+# Token IDs logged out through this gateway, kept until the token itself expires.
+# Logouts sent straight to the auth service are not seen here, which is the
+# trade-off for never calling it on the hot path.
+revoked_token_ids = TTLCache(AUTH_CACHE_SIZE)
+
+def decode_token(auth_header):
+    """Claims of a valid signed token, or None; checked without calling the auth service"""
+    token = token_key(auth_header)
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid not in AUTH_SIGNING_KEYS:
+            return None
+        claims = jwt.decode(token, AUTH_SIGNING_KEYS[kid], algorithms=["HS256"], options={"require": ["exp", "jti"]})
+    except jwt.InvalidTokenError:
+        return None
+    if revoked_token_ids.get(claims["jti"]):
+        return None
+    return claims
+
+def forget_token(auth_header):
+    """Drop a logged-out token from every gateway-side cache"""
+    token_cache.delete(token_key(auth_header))
+    if GATEWAY_VERIFY_TOKENS:
+        claims = decode_token(auth_header)
+        if claims:
+            revoked_token_ids.set(claims["jti"], True, max(0, claims["exp"] - time.time()))
+
+# Response cache settings for public GETs, TTLs matched on the longest path prefix
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTLS = {
+    "/api/rooms": float(os.getenv("RESPONSE_CACHE_TTL_ROOMS", "30")),
+    "/api/weather/forecast/": float(os.getenv("RESPONSE_CACHE_TTL_FORECAST", "60"))
+}
+
+# Path + query -> (body, content type, etag)
+response_cache = TTLCache(RESPONSE_CACHE_SIZE)
+
+def response_cache_ttl(path):
+    return RESPONSE_CACHE_TTLS[max((prefix for prefix in RESPONSE_CACHE_TTLS if path.startswith(prefix)), key=len)]
+
+def make_etag(body):
+    return hashlib.sha256(body).hexdigest()[:32]
+
+def invalidate_responses(*prefixes):
+    for prefix in prefixes:
+        response_cache.delete_prefix(prefix)
+
+# ==========================================
+# METRICS & ACCESS LOG
+# ==========================================
+REQUEST_COUNT = Counter("http_requests_total", "HTTP requests handled", ["route", "method", "status"])
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ["route", "method"])
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of each upstream call until response headers",
+    ["upstream", "method", "outcome"]
+)
+
+ACCESS_LOG_BATCH_SIZE = int(os.getenv("ACCESS_LOG_BATCH_SIZE", "256"))
+ACCESS_LOG_QUEUE_SIZE = int(os.getenv("ACCESS_LOG_QUEUE_SIZE", "10000"))
+
+class AccessLog:
+    """JSON-lines access log, written in batches by a background thread"""
+
+    def __init__(self, service, stream=sys.stdout):
+        self.service = service
+        self.stream = stream
+        self.entries = queue.Queue(maxsize=ACCESS_LOG_QUEUE_SIZE)
+        self.dropped = 0
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def log(self, **fields):
+        fields["ts"] = datetime.utcnow().isoformat()
+        fields["service"] = self.service
+        try:
+            self.entries.put_nowait(fields)
+        except queue.Full:
+            # Never block a request on logging
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            batch = [self.entries.get()]
+            while len(batch) < ACCESS_LOG_BATCH_SIZE:
+                try:
+                    batch.append(self.entries.get_nowait())
+                except queue.Empty:
+                    break
+            self.stream.write("".join(json.dumps(entry) + "\n" for entry in batch))
+            self.stream.flush()
+
+access_log = AccessLog("api_gateway")
+
+def observe_request(route, method, status, duration, path):
+    REQUEST_COUNT.labels(route, method, status).inc()
+    REQUEST_LATENCY.labels(route, method).observe(duration)
+    access_log.log(method=method, path=path, route=route, status=status, duration_ms=round(duration * 1000, 2))
+
+def observe_upstream(upstream, method, outcome, started):
+    UPSTREAM_LATENCY.labels(upstream, method, outcome).observe(time.perf_counter() - started)
+
+def upstream_outcome(status_code):
+    return "failure" if status_code in FAILURE_STATUSES else "ok"
+
+@app.before_request
+def start_timer():
+    g.start_time = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    duration = time.perf_counter() - g.get("start_time", time.perf_counter())
+    observe_request(route, request.method, response.status_code, duration, request.path)
+    return response
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
 
 # Authentication middleware
 def require_auth(f):
@@ -27,16 +459,38 @@ def require_auth(f):
         if not auth_header:
             return jsonify({"error": "Authorization header required"}), 401
         
+        # Signed tokens can be checked right here
+        if GATEWAY_VERIFY_TOKENS:
+            if decode_token(auth_header) is None:
+                return jsonify({"error": "Invalid or expired token"}), 401
+            return f(*args, **kwargs)
+        
+        # Serve repeat verifications from the cache
+        key = token_key(auth_header)
+        valid = token_cache.get(key)
+        if valid is False:
+            return jsonify({"error": "Invalid or expired token"}), 401
+        if valid:
+            return f(*args, **kwargs)
+        
         # Verify token with auth service
         try:
             # The auth service just needs the Authorization header, not a JSON body
-            verify_response = requests.post(
+            started = time.perf_counter()
+            verify_response = sessions["auth"].post(
                 f"{AUTH_SERVICE_URL}/api/auth/verify",
-                headers={"Authorization": auth_header}
+                headers={"Authorization": auth_header},
+                timeout=get_timeout("/api/auth/verify")
             )
+            observe_upstream("auth", "POST", upstream_outcome(verify_response.status_code), started)
             
             if verify_response.status_code != 200:
+                # Only cache definitive rejections, not auth service errors
+                if verify_response.status_code in (401, 404):
+                    token_cache.set(key, False, AUTH_CACHE_NEGATIVE_TTL)
                 return jsonify({"error": "Invalid or expired token"}), 401
+            
+            token_cache.set(key, True, AUTH_CACHE_TTL)
                 
         except Exception as e:
             return jsonify({"error": f"Authentication failed: {str(e)}"}), 500
@@ -45,71 +499,259 @@ def require_auth(f):
     
     return decorated_function
 
+# Error response with the status set on the object, so callers can read status_code
+def error_response(message, status):
+    response = jsonify({"error": message})
+    response.status_code = status
+    return response
+
+# Forwarded upstream response headers
+PASSTHROUGH_HEADERS = ("Content-Type", "Content-Encoding", "Content-Length")
+
+def upstream_response(response):
+    """Turn a stream=True upstream response into a Flask Response.
+
+    Bodies up to PROXY_MAX_BUFFER bytes are read in one go; larger or
+    unknown-length bodies are streamed to the client chunk by chunk.
+    """
+    headers = {name: response.headers[name] for name in PASSTHROUGH_HEADERS if name in response.headers}
+    headers.setdefault("Content-Type", "application/json")
+    content_length = response.headers.get("Content-Length")
+    
+    if not PROXY_STREAMING or (content_length is not None and int(content_length) <= PROXY_MAX_BUFFER):
+        try:
+            body = response.raw.read(decode_content=False)
+        except ReadTimeoutError as e:
+            raise requests.exceptions.ReadTimeout(e)
+        except ProtocolError as e:
+            raise requests.exceptions.ConnectionError(e)
+        finally:
+            response.close()
+        headers["Content-Length"] = str(len(body))
+        return Response(body, status=response.status_code, headers=headers)
+    
+    def generate():
+        try:
+            yield from response.raw.stream(PROXY_CHUNK_SIZE, decode_content=False)
+        finally:
+            # Returns the connection to the pool
+            response.close()
+    
+    return Response(generate(), status=response.status_code, headers=headers, direct_passthrough=True)
+
+# Single-flight settings: GETs plus these read-only POSTs are coalesced
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "true").lower() == "true"
+COALESCE_POST_PATHS = {"/api/booking/check-availability", "/api/booking/availability/bulk"}
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one; every waiter gets its result"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.upstream_calls = 0
+        self.collapsed = 0
+
+    def do(self, key, fn):
+        """Return (result, shared); shared is True when another caller made the call"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {"done": threading.Event(), "result": None}
+                self.upstream_calls += 1
+            else:
+                self.collapsed += 1
+        
+        if not leader:
+            call["done"].wait()
+            return call["result"], True
+        
+        try:
+            call["result"] = fn()
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call["done"].set()
+        return call["result"], False
+
+    def stats(self):
+        with self.lock:
+            return {
+                "upstream_calls": self.upstream_calls,
+                "collapsed": self.collapsed,
+                "in_flight": len(self.calls)
+            }
+
+coalescer = SingleFlight()
+
+def coalesce_key(service_url, path, method, data, headers):
+    """Identify a request by everything that is forwarded upstream, or None if it must not be shared"""
+    if not COALESCE_REQUESTS:
+        return None
+    if method == 'GET':
+        body = b""
+    elif method == 'POST' and path in COALESCE_POST_PATHS:
+        body = json.dumps(data, sort_keys=True).encode() if data is not None else request.get_data()
+    else:
+        return None
+    return (
+        method,
+        f"{service_url}{path}",
+        request.query_string if method == 'GET' else b"",
+        body,
+        tuple(sorted((headers or {}).items())),
+        request.headers.get("Accept-Encoding", "identity")
+    )
+
 # Proxy function to forward requests
 def proxy_request(service_url, path, method='GET', data=None, headers=None):
+    key = coalesce_key(service_url, path, method, data, headers)
+    if key is None:
+        return forward_request(service_url, path, method, data, headers)
+    
+    response, shared = coalescer.do(key, lambda: forward_request(service_url, path, method, data, headers))
+    if not shared:
+        return response
+    # A streamed body can only be read once, so followers make their own call
+    if response is None or response.is_streamed:
+        return forward_request(service_url, path, method, data, headers)
+    headers = {name: response.headers[name] for name in PASSTHROUGH_HEADERS if name in response.headers}
+    return Response(response.get_data(), status=response.status_code, headers=headers)
+
+def shed_response(message):
+    response = error_response(message, 503)
+    response.headers["Retry-After"] = "1"
+    return response
+
+def forward_request(service_url, path, method='GET', data=None, headers=None):
+    if method not in ('GET', 'POST', 'PUT', 'DELETE'):
+        return error_response("Method not allowed", 405)
+    
+    url = f"{service_url}{path}"
+    
+    # Prepare headers
+    req_headers = {}
+    if headers:
+        req_headers.update(headers)
+    
+    # Upstream bytes are passed through untouched, so only ask for encodings the client accepts
+    req_headers.setdefault("Accept-Encoding", request.headers.get("Accept-Encoding", "identity"))
+    
+    kwargs = {"headers": req_headers, "timeout": get_timeout(path), "stream": True}
+    if method == 'GET':
+        kwargs["params"] = request.args
+    elif method in ('POST', 'PUT'):
+        kwargs["json"] = data if data is not None else request.get_json()
+    
+    name = get_service_name(service_url)
+    limiter = limiters[name]
+    if not limiter.try_acquire():
+        return shed_response(f"{name} service overloaded")
+    
     try:
-        url = f"{service_url}{path}"
-        
-        # Prepare headers
-        req_headers = {}
-        if headers:
-            req_headers.update(headers)
-        
-        # Forward the request
-        if method == 'GET':
-            response = requests.get(url, headers=req_headers, params=request.args)
-        elif method == 'POST':
-            response = requests.post(url, json=data or request.get_json(), headers=req_headers)
-        elif method == 'PUT':
-            response = requests.put(url, json=data or request.get_json(), headers=req_headers)
-        elif method == 'DELETE':
-            response = requests.delete(url, headers=req_headers)
+        return send_with_retries(name, method, url, kwargs)
+    except requests.exceptions.Timeout as e:
+        return error_response(f"Service timed out: {str(e)}", 504)
+    except requests.exceptions.RequestException as e:
+        return error_response(f"Service unavailable: {str(e)}", 503)
+    finally:
+        limiter.release()
+
+def send_with_retries(name, method, url, kwargs):
+    """Send through the upstream's circuit breaker, retrying idempotent failures"""
+    breaker = breakers[name]
+    # The breaker admits and counts whole requests: retries are bounded by the retry
+    # budget and only the final outcome is recorded, so one bad request is one failure
+    if not breaker.allow():
+        return shed_response(f"{name} service circuit open")
+    retry_budget.deposit()
+    attempt = 0
+    
+    while True:
+        started = time.perf_counter()
+        try:
+            response = sessions[name].request(method, url, **kwargs)
+        except requests.exceptions.RequestException as e:
+            observe_upstream(name, method, "error", started)
+            retryable = isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+            if not retryable or not can_retry(method, attempt):
+                breaker.record_failure()
+                raise
         else:
-            return jsonify({"error": "Method not allowed"}), 405
-        
-        return Response(
-            response.content,
-            status=response.status_code,
-            content_type=response.headers.get('Content-Type', 'application/json')
-        )
+            observe_upstream(name, method, upstream_outcome(response.status_code), started)
+            if response.status_code not in FAILURE_STATUSES:
+                breaker.record_success()
+                return upstream_response(response)
+            if not can_retry(method, attempt):
+                breaker.record_failure()
+                return upstream_response(response)
+            response.close()
         
-    except requests.exceptions.RequestException as e:
-        return jsonify({"error": f"Service unavailable: {str(e)}"}), 503
+        time.sleep(backoff_delay(attempt))
+        attempt += 1
+
+def cached_proxy(service_url, path):
+    """Proxy a public GET through the response cache, answering If-None-Match with 304"""
+    key = request.full_path
+    entry = response_cache.get(key)
+    cache_status = "HIT"
+    
+    if entry is None:
+        cache_status = "MISS"
+        generation = response_cache.generation
+        response = proxy_request(service_url, path, method='GET')
+        # Errors, streamed bodies and encoded bodies go straight back uncached
+        if response.status_code != 200 or response.is_streamed or "Content-Encoding" in response.headers:
+            return response
+        body = response.get_data()
+        entry = (body, response.headers["Content-Type"], make_etag(body))
+        response_cache.set(key, entry, response_cache_ttl(path), generation=generation)
+    
+    body, content_type, etag = entry
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, status=200, content_type=content_type)
+    response.set_etag(etag)
+    # Clients may keep the body but must revalidate, so writes show up immediately
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Cache"] = cache_status
+    return response
 
 # ==========================================
 # HEALTH CHECK
 # ==========================================
+def check_service(service_name):
+    """Return (name, status dict, healthy) for one upstream"""
+    service_url = UPSTREAMS[service_name]
+    try:
+        response = sessions[service_name].get(f"{service_url}/health", timeout=get_timeout("/health"))
+        status = {
+            "status": "healthy" if response.status_code == 200 else "unhealthy",
+            "code": response.status_code
+        }
+        return service_name, status, response.status_code == 200
+    except Exception as e:
+        return service_name, {"status": "unhealthy", "error": str(e)}, False
+
 @app.route("/health", methods=["GET"])
 def health():
-    # Check all services health
+    # Check all services health concurrently, so one dead service costs one timeout
     services_status = {}
-    
-    services = {
-        "auth": f"{AUTH_SERVICE_URL}/health",
-        "room": f"{ROOM_SERVICE_URL}/health",
-        "weather": f"{WEATHER_SERVICE_URL}/health"
-    }
-    
     all_healthy = True
-    for service_name, health_url in services.items():
-        try:
-            response = requests.get(health_url, timeout=2)
-            services_status[service_name] = {
-                "status": "healthy" if response.status_code == 200 else "unhealthy",
-                "code": response.status_code
-            }
-            if response.status_code != 200:
-                all_healthy = False
-        except Exception as e:
-            services_status[service_name] = {
-                "status": "unhealthy",
-                "error": str(e)
-            }
-            all_healthy = False
+    for service_name, status, healthy in upstream_executor.map(check_service, UPSTREAMS):
+        services_status[service_name] = status
+        all_healthy = all_healthy and healthy
     
     return jsonify({
         "gateway": "healthy",
         "services": services_status,
+        "pools": pool_stats(),
+        "auth_cache": token_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "coalescing": coalescer.stats(),
+        **resilience_stats(),
         "overall": "healthy" if all_healthy else "degraded"
     }), 200 if all_healthy else 503
 
@@ -118,24 +760,24 @@ def health():
 # ==========================================
 @app.route("/api/auth/register", methods=["POST"])
 def auth_register():
-    log_request("auth", "/register", "POST", "->")
-    response = proxy_request(AUTH_SERVICE_URL, "/api/auth/register", method='POST')
-    log_request("auth", "/register", "POST", response.status_code)
-    return response
+    return proxy_request(AUTH_SERVICE_URL, "/api/auth/register", method='POST')
 
 @app.route("/api/auth/login", methods=["POST"])
 def auth_login():
-    log_request("auth", "/login", "POST", "->")
-    response = proxy_request(AUTH_SERVICE_URL, "/api/auth/login", method='POST')
-    log_request("auth", "/login", "POST", response.status_code)
-    return response
+    return proxy_request(AUTH_SERVICE_URL, "/api/auth/login", method='POST')
 
 @app.route("/api/auth/verify", methods=["POST"])
 def auth_verify():
-    log_request("auth", "/verify", "POST", "->")
     headers = {"Authorization": request.headers.get("Authorization")}
-    response = proxy_request(AUTH_SERVICE_URL, "/api/auth/verify", method='POST', headers=headers)
-    log_request("auth", "/verify", "POST", response.status_code)
+    return proxy_request(AUTH_SERVICE_URL, "/api/auth/verify", method='POST', headers=headers)
+
+@app.route("/api/auth/logout", methods=["POST"])
+def auth_logout():
+    auth_header = request.headers.get("Authorization")
+    headers = {"Authorization": auth_header} if auth_header else None
+    response = proxy_request(AUTH_SERVICE_URL, "/api/auth/logout", method='POST', data={}, headers=headers)
+    if auth_header:
+        forget_token(auth_header)
     return response
 
 # ==========================================
@@ -143,40 +785,59 @@ def auth_verify():
 # ==========================================
 @app.route("/api/rooms", methods=["GET"])
 def get_rooms():
-    log_request("room", "/rooms", "GET", "->")
-    response = proxy_request(ROOM_SERVICE_URL, "/api/rooms", method='GET')
-    log_request("room", "/rooms", "GET", response.status_code)
-    return response
+    return cached_proxy(ROOM_SERVICE_URL, "/api/rooms")
 
 @app.route("/api/rooms/<room_id>", methods=["GET"])
 def get_room(room_id):
-    log_request("room", f"/rooms/{room_id}", "GET", "->")
-    response = proxy_request(ROOM_SERVICE_URL, f"/api/rooms/{room_id}", method='GET')
-    log_request("room", f"/rooms/{room_id}", "GET", response.status_code)
-    return response
+    return cached_proxy(ROOM_SERVICE_URL, f"/api/rooms/{room_id}")
+
+@app.route("/api/rooms/availability", methods=["GET"])
+def get_rooms_availability():
+    """Room catalog plus availability and pricing for every room on one date"""
+    date = request.args.get("date")
+    if not date:
+        return jsonify({"error": "date is required"}), 400
+    
+    # Sub-requests go through the gateway's own routes, so the catalog is served from the
+    # response cache; availability for every room is one bulk call, made in parallel
+    catalog = batch_executor.submit(run_sub_request, {"path": "/api/rooms"}, None)
+    availability = batch_executor.submit(run_sub_request, {
+        "method": "POST",
+        "path": "/api/booking/availability/bulk",
+        "body": {"date": date, "rooms": "all"}
+    }, None)
+    done, _ = wait([catalog, availability], timeout=BATCH_TIMEOUT)
+    
+    result = catalog.result() if catalog in done else batch_timeout_result()
+    if result["status"] != 200:
+        return jsonify(result["body"]), result["status"]
+    rooms = result["body"].get("rooms", [])
+    
+    return jsonify({
+        "date": date,
+        "rooms": merge_availability(rooms, availability.result() if availability in done else batch_timeout_result()),
+        "count": len(rooms)
+    }), 200
 
 @app.route("/api/rooms", methods=["POST"])
 @require_auth
 def create_room():
-    log_request("room", "/rooms", "POST", "->")
     response = proxy_request(ROOM_SERVICE_URL, "/api/rooms", method='POST')
-    log_request("room", "/rooms", "POST", response.status_code)
+    invalidate_responses("/api/rooms")
     return response
 
 @app.route("/api/rooms/<room_id>", methods=["PUT"])
 @require_auth
 def update_room(room_id):
-    log_request("room", f"/rooms/{room_id}", "PUT", "->")
     response = proxy_request(ROOM_SERVICE_URL, f"/api/rooms/{room_id}", method='PUT')
-    log_request("room", f"/rooms/{room_id}", "PUT", response.status_code)
+    invalidate_responses("/api/rooms")
     return response
 
 @app.route("/api/rooms/<room_id>", methods=["DELETE"])
 @require_auth
 def delete_room(room_id):
-    log_request("room", f"/rooms/{room_id}", "DELETE", "->")
     response = proxy_request(ROOM_SERVICE_URL, f"/api/rooms/{room_id}", method='DELETE')
-    log_request("room", f"/rooms/{room_id}", "DELETE", response.status_code)
+    invalidate_responses("/api/rooms")
     return response
 
 # ==========================================
@@ -184,56 +845,174 @@ def delete_room(room_id):
 # ==========================================
 @app.route("/api/weather/forecast", methods=["POST"])
 def get_weather_forecast():
-    log_request("weather", "/forecast", "POST", "->")
-    response = proxy_request(WEATHER_SERVICE_URL, "/api/weather/forecast", method='POST')
-    log_request("weather", "/forecast", "POST", response.status_code)
-    return response
+    return proxy_request(WEATHER_SERVICE_URL, "/api/weather/forecast", method='POST')
 
 @app.route("/api/weather/forecast/<location>", methods=["GET"])
 def get_forecasts_by_location(location):
-    log_request("weather", f"/forecast/{location}", "GET", "->")
-    response = proxy_request(WEATHER_SERVICE_URL, f"/api/weather/forecast/{location}", method='GET')
-    log_request("weather", f"/forecast/{location}", "GET", response.status_code)
-    return response
+    return cached_proxy(WEATHER_SERVICE_URL, f"/api/weather/forecast/{location}")
 
 @app.route("/api/weather/forecasts", methods=["GET"])
 def get_all_forecasts():
-    log_request("weather", "/forecasts", "GET", "->")
-    response = proxy_request(WEATHER_SERVICE_URL, "/api/weather/forecasts", method='GET')
-    log_request("weather", "/forecasts", "GET", response.status_code)
-    return response
+    return proxy_request(WEATHER_SERVICE_URL, "/api/weather/forecasts", method='GET')
 
 # ==========================================
 # BOOKING ROUTES (Weather Service - Public)
 # ==========================================
 @app.route("/api/booking/check-availability", methods=["POST"])
 def check_availability():
-    log_request("weather", "/check-availability", "POST", "->")
-    response = proxy_request(WEATHER_SERVICE_URL, "/api/booking/check-availability", method='POST')
-    log_request("weather", "/check-availability", "POST", response.status_code)
-    return response
+    return proxy_request(WEATHER_SERVICE_URL, "/api/booking/check-availability", method='POST')
+
+@app.route("/api/booking/availability/bulk", methods=["POST"])
+def bulk_availability():
+    return proxy_request(WEATHER_SERVICE_URL, "/api/booking/availability/bulk", method='POST')
 
 @app.route("/api/booking/confirm", methods=["POST"])
 def confirm_booking():
-    log_request("weather", "/confirm", "POST", "->")
     response = proxy_request(WEATHER_SERVICE_URL, "/api/booking/confirm", method='POST')
-    log_request("weather", "/confirm", "POST", response.status_code)
+    invalidate_responses("/api/rooms", "/api/weather/forecast/")
     return response
 
 @app.route("/api/booking/room/<room_id>/<date>", methods=["GET"])
 def get_room_bookings(room_id, date):
-    log_request("weather", f"/room/{room_id}/{date}", "GET", "->")
-    response = proxy_request(WEATHER_SERVICE_URL, f"/api/booking/room/{room_id}/{date}", method='GET')
-    log_request("weather", f"/room/{room_id}/{date}", "GET", response.status_code)
-    return response
+    return proxy_request(WEATHER_SERVICE_URL, f"/api/booking/room/{room_id}/{date}", method='GET')
+
+@app.route("/api/booking/calendar", methods=["GET"])
+def get_booking_calendar():
+    return proxy_request(WEATHER_SERVICE_URL, "/api/booking/calendar", method='GET')
 
 @app.route("/api/booking/cancel/<booking_id>", methods=["POST"])
 def cancel_booking(booking_id):
-    log_request("weather", f"/cancel/{booking_id}", "POST", "->")
     response = proxy_request(WEATHER_SERVICE_URL, f"/api/booking/cancel/{booking_id}", method='POST')
-    log_request("weather", f"/cancel/{booking_id}", "POST", response.status_code)
+    invalidate_responses("/api/rooms", "/api/weather/forecast/")
     return response
 
+# ==========================================
+# BATCH ENDPOINT
+# ==========================================
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+BATCH_TIMEOUT = float(os.getenv("BATCH_TIMEOUT", "10"))
+BATCH_METHODS = {"GET", "POST", "PUT", "DELETE"}
+
+# Routes that fan out on batch_executor themselves; run as a sub-request they would hold
+# a worker while waiting for others from the same pool, and can deadlock it under load
+BATCH_COMPOSITE_ROUTES = {"/api/rooms/availability"}
+
+# Sub-requests run on their own pool so they never starve the health fan-out
+batch_executor = ThreadPoolExecutor(max_workers=int(os.getenv("BATCH_WORKERS", "32")))
+
+def validate_batch(payload):
+    """Return (sub-requests, None) for a valid batch body, otherwise (None, error message)"""
+    sub_requests = payload.get("requests") if isinstance(payload, dict) else None
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return None, "requests must be a non-empty list"
+    if len(sub_requests) > BATCH_MAX_REQUESTS:
+        return None, f"At most {BATCH_MAX_REQUESTS} requests per batch"
+    
+    for index, sub in enumerate(sub_requests):
+        if not isinstance(sub, dict):
+            return None, f"Request {index} must be an object"
+        if str(sub.get("method", "GET")).upper() not in BATCH_METHODS:
+            return None, f"Request {index} has an unsupported method"
+        path = sub.get("path")
+        if not isinstance(path, str) or not path.startswith("/api/") or path.startswith("/api/batch"):
+            return None, f"Request {index} must target an /api/ route other than /api/batch"
+        if path.split("?", 1)[0].rstrip("/") in BATCH_COMPOSITE_ROUTES:
+            return None, f"Request {index} targets a composite route that cannot run inside a batch"
+        if sub.get("headers") is not None and not isinstance(sub["headers"], dict):
+            return None, f"Request {index} headers must be an object"
+    
+    return sub_requests, None
+
+def sub_request_headers(sub, auth_header):
+    # Sub-requests inherit the batch's Authorization unless they bring their own
+    headers = {str(name): str(value) for name, value in (sub.get("headers") or {}).items()}
+    if auth_header and not any(name.lower() == "authorization" for name in headers):
+        headers["Authorization"] = auth_header
+    return headers
+
+def decode_body(data, content_type):
+    if content_type and "json" in content_type:
+        try:
+            return json.loads(data)
+        except ValueError:
+            pass
+    return data.decode("utf-8", errors="replace")
+
+def batch_timeout_result():
+    return {"status": 504, "body": {"error": "Batch time limit exceeded"}}
+
+# The composite listing is public: bookings are reduced to these fields even if an
+# upstream sends more
+BOOKING_SUMMARY_FIELDS = ("_id", "status", "booked_at")
+
+def booking_summary(booking):
+    if not isinstance(booking, dict):
+        return None
+    return {field: booking[field] for field in BOOKING_SUMMARY_FIELDS if field in booking}
+
+def merge_availability(rooms, result):
+    """Merge a bulk availability sub-request result into the catalog entries"""
+    body = result["body"] if isinstance(result["body"], dict) else {}
+    if result["status"] != 200:
+        error = body.get("error", f"Status {result['status']}")
+        return [{**room, "available": False, "error": error} for room in rooms]
+    
+    by_id = {entry["room_id"]: entry for entry in body.get("rooms", [])}
+    merged = []
+    for room in rooms:
+        entry = by_id.get(room.get("room_id"))
+        if entry is None:
+            merged.append({**room, "available": False, "error": "Availability unknown"})
+        else:
+            merged.append({
+                **room,
+                "available": entry.get("available", False),
+                "pricing": entry.get("pricing"),
+                "existing_booking": booking_summary(entry.get("existing_booking"))
+            })
+    return merged
+
+def run_sub_request(sub, auth_header):
+    """Dispatch one sub-request through the gateway's own routes, including require_auth"""
+    builder = EnvironBuilder(
+        path=sub["path"],
+        method=str(sub.get("method", "GET")).upper(),
+        headers=sub_request_headers(sub, auth_header),
+        json=sub.get("body")
+    )
+    try:
+        with app.request_context(builder.get_environ()):
+            response = app.full_dispatch_request()
+            try:
+                data = response.get_data()
+            finally:
+                response.close()
+    except Exception as e:
+        return {"status": 500, "body": {"error": f"Sub-request failed: {str(e)}"}}
+    finally:
+        builder.close()
+    
+    return {"status": response.status_code, "body": decode_body(data, response.content_type)}
+
+@app.route("/api/batch", methods=["POST"])
+def batch():
+    sub_requests, error = validate_batch(request.get_json(silent=True))
+    if error:
+        return jsonify({"error": error}), 400
+    
+    auth_header = request.headers.get("Authorization")
+    futures = [batch_executor.submit(run_sub_request, sub, auth_header) for sub in sub_requests]
+    done, pending = wait(futures, timeout=BATCH_TIMEOUT)
+    for future in pending:
+        future.cancel()
+    
+    responses = []
+    for sub, future in zip(sub_requests, futures):
+        result = future.result() if future in done else batch_timeout_result()
+        responses.append({"id": sub.get("id"), **result})
+    
+    return jsonify({"responses": responses}), 200
+
 # ==========================================
 # ERROR HANDLERS
 # ==========================================
@@ -246,4 +1025,10 @@ def internal_error(error):
     return jsonify({"error": "Internal server error"}), 500
 
 if __name__ == "__main__":
+    # GATEWAY_MODE=async serves the same routes from an asyncio event loop. async_app.py is
+    # its own entry point: importing it from here would load this module a second time
+    # (as "app" next to "__main__") and register every metric and cache twice
+    if os.getenv("GATEWAY_MODE", "sync") == "async":
+        async_entry = os.path.join(os.path.dirname(os.path.abspath(__file__)), "async_app.py")
+        os.execv(sys.executable, [sys.executable, async_entry])
     app.run(host="0.0.0.0", port=80, debug=False)
\ No newline at end of file
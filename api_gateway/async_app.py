@@ -0,0 +1,523 @@
+from aiohttp import web
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+import aiohttp
+import asyncio
+import os
+import time
+
+from app import (
+    UPSTREAMS,
+    UPSTREAM_POOL_SIZE,
+    PROXY_STREAMING,
+    PROXY_MAX_BUFFER,
+    PROXY_CHUNK_SIZE,
+    PASSTHROUGH_HEADERS,
+    AUTH_CACHE_TTL,
+    AUTH_CACHE_NEGATIVE_TTL,
+    get_timeout,
+    token_cache,
+    token_key,
+    GATEWAY_VERIFY_TOKENS,
+    decode_token,
+    forget_token,
+    response_cache,
+    response_cache_ttl,
+    make_etag,
+    invalidate_responses,
+    COALESCE_REQUESTS,
+    COALESCE_POST_PATHS,
+    FAILURE_STATUSES,
+    breakers,
+    limiters,
+    retry_budget,
+    can_retry,
+    backoff_delay,
+    resilience_stats,
+    observe_request,
+    observe_upstream,
+    upstream_outcome,
+    BATCH_MAX_REQUESTS,
+    BATCH_TIMEOUT,
+    validate_batch,
+    sub_request_headers,
+    decode_body,
+    batch_timeout_result,
+    merge_availability
+)
+
+# Asyncio serving mode for the API gateway (GATEWAY_MODE=async).
+# Same routes and config as app.py, but upstream I/O never blocks a thread,
+# so one process can hold thousands of concurrent client connections.
+
+GATEWAY_PORT = int(os.getenv("GATEWAY_PORT", "80"))
+GATEWAY_BACKLOG = int(os.getenv("GATEWAY_BACKLOG", "2048"))
+
+# One pooled client session per upstream service, opened on startup
+sessions = {}
+
+# Loopback session used by /api/batch to dispatch sub-requests through our own routes
+BATCH_SESSION = "batch"
+
+async def start_sessions(app):
+    for name in UPSTREAMS:
+        connector = aiohttp.TCPConnector(limit=UPSTREAM_POOL_SIZE)
+        # Bodies are passed through as-is, including any Content-Encoding
+        sessions[name] = aiohttp.ClientSession(connector=connector, auto_decompress=False)
+    sessions[BATCH_SESSION] = aiohttp.ClientSession(
+        base_url=f"http://127.0.0.1:{GATEWAY_PORT}",
+        connector=aiohttp.TCPConnector(limit=BATCH_MAX_REQUESTS * 4)
+    )
+
+async def close_sessions(app):
+    await asyncio.gather(*(session.close() for session in sessions.values()))
+
+def client_timeout(path):
+    connect, read = get_timeout(path)
+    return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+def error_response(message, status):
+    return web.json_response({"error": message}, status=status)
+
+# Authentication check, shares the token cache with the sync gateway code
+async def check_auth(request):
+    """Return None when the request is authorized, otherwise an error response"""
+    auth_header = request.headers.get("Authorization")
+
+    if not auth_header:
+        return error_response("Authorization header required", 401)
+
+    if GATEWAY_VERIFY_TOKENS:
+        if decode_token(auth_header) is None:
+            return error_response("Invalid or expired token", 401)
+        return None
+
+    key = token_key(auth_header)
+    valid = token_cache.get(key)
+    if valid is False:
+        return error_response("Invalid or expired token", 401)
+    if valid:
+        return None
+
+    try:
+        started = time.perf_counter()
+        async with sessions["auth"].post(
+            f"{UPSTREAMS['auth']}/api/auth/verify",
+            headers={"Authorization": auth_header},
+            timeout=client_timeout("/api/auth/verify")
+        ) as verify_response:
+            observe_upstream("auth", "POST", upstream_outcome(verify_response.status), started)
+            if verify_response.status != 200:
+                if verify_response.status in (401, 404):
+                    token_cache.set(key, False, AUTH_CACHE_NEGATIVE_TTL)
+                return error_response("Invalid or expired token", 401)
+    except Exception as e:
+        return error_response(f"Authentication failed: {str(e)}", 500)
+
+    token_cache.set(key, True, AUTH_CACHE_TTL)
+    return None
+
+async def upstream_response(request, response):
+    """Buffer small upstream bodies, stream the rest to the client chunk by chunk"""
+    headers = {name: response.headers[name] for name in PASSTHROUGH_HEADERS if name in response.headers}
+    headers.setdefault("Content-Type", "application/json")
+
+    if not PROXY_STREAMING or (response.content_length is not None and response.content_length <= PROXY_MAX_BUFFER):
+        return web.Response(body=await response.read(), status=response.status, headers=headers)
+
+    # Headers are sent on prepare(), so CORS has to be set here rather than in the middleware
+    headers["Access-Control-Allow-Origin"] = "*"
+    stream = web.StreamResponse(status=response.status, headers=headers)
+    await stream.prepare(request)
+    async for chunk in response.content.iter_chunked(PROXY_CHUNK_SIZE):
+        await stream.write(chunk)
+    await stream.write_eof()
+    return stream
+
+class AsyncSingleFlight:
+    """Collapse concurrent identical calls on the event loop into one"""
+
+    def __init__(self):
+        self.calls = {}
+        self.upstream_calls = 0
+        self.collapsed = 0
+
+    async def do(self, key, fn):
+        """Return (result, shared); shared is True when another caller made the call"""
+        future = self.calls.get(key)
+        if future is not None:
+            self.collapsed += 1
+            return await asyncio.shield(future), True
+
+        future = self.calls[key] = asyncio.get_running_loop().create_future()
+        self.upstream_calls += 1
+        result = None
+        try:
+            result = await fn()
+        finally:
+            del self.calls[key]
+            # Followers of a failed or cancelled leader get None and call upstream themselves
+            future.set_result(result)
+        return result, False
+
+    def stats(self):
+        return {
+            "upstream_calls": self.upstream_calls,
+            "collapsed": self.collapsed,
+            "in_flight": len(self.calls)
+        }
+
+coalescer = AsyncSingleFlight()
+
+async def coalesce_key(service, request, headers):
+    """Identify a request by everything that is forwarded upstream, or None if it must not be shared"""
+    if not COALESCE_REQUESTS:
+        return None
+    if request.method == "GET":
+        body = b""
+    elif request.method == "POST" and request.path in COALESCE_POST_PATHS:
+        body = await request.read()
+    else:
+        return None
+    return (
+        request.method,
+        f"{UPSTREAMS[service]}{request.rel_url.raw_path}",
+        request.query_string if request.method == "GET" else "",
+        body,
+        tuple(sorted((headers or {}).items())),
+        request.headers.get("Accept-Encoding", "identity")
+    )
+
+# Proxy function to forward requests
+async def proxy_request(service, request, headers=None):
+    key = await coalesce_key(service, request, headers)
+    if key is None:
+        return await forward_request(service, request, headers)
+
+    response, shared = await coalescer.do(key, lambda: forward_request(service, request, headers))
+    if not shared:
+        return response
+    # A streamed body has already gone to the leader's client, so followers make their own call
+    if response is None or type(response) is not web.Response:
+        return await forward_request(service, request, headers)
+    headers = {name: response.headers[name] for name in PASSTHROUGH_HEADERS if name in response.headers}
+    return web.Response(body=response.body, status=response.status, headers=headers)
+
+def shed_response(message):
+    response = error_response(message, 503)
+    response.headers["Retry-After"] = "1"
+    return response
+
+async def forward_request(service, request, headers=None):
+    url = f"{UPSTREAMS[service]}{request.rel_url.raw_path}"
+
+    req_headers = {"Accept-Encoding": request.headers.get("Accept-Encoding", "identity")}
+    if headers:
+        req_headers.update(headers)
+
+    # Mirror the sync gateway: GETs keep their query string, POST/PUT bodies are JSON
+    params = request.query if request.method == "GET" else None
+    body = None
+    if request.method in ("POST", "PUT"):
+        body = await request.read()
+        req_headers["Content-Type"] = "application/json"
+
+    limiter = limiters[service]
+    if not limiter.try_acquire():
+        return shed_response(f"{service} service overloaded")
+
+    try:
+        return await send_with_retries(service, request, url, params, body, req_headers)
+    except asyncio.TimeoutError as e:
+        return error_response(f"Service timed out: {str(e)}", 504)
+    except aiohttp.ClientError as e:
+        return error_response(f"Service unavailable: {str(e)}", 503)
+    finally:
+        limiter.release()
+
+async def send_with_retries(service, request, url, params, body, headers):
+    """Send through the upstream's circuit breaker, retrying idempotent failures"""
+    breaker = breakers[service]
+    # One admission and one recorded outcome per request, however many retries it takes
+    if not breaker.allow():
+        return shed_response(f"{service} service circuit open")
+    retry_budget.deposit()
+    attempt = 0
+
+    while True:
+        started = time.perf_counter()
+        try:
+            response = await sessions[service].request(
+                request.method,
+                url,
+                params=params,
+                data=body,
+                headers=headers,
+                timeout=client_timeout(request.path)
+            )
+        except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+            observe_upstream(service, request.method, "error", started)
+            retryable = isinstance(e, (asyncio.TimeoutError, aiohttp.ClientConnectionError))
+            if not retryable or not can_retry(request.method, attempt):
+                breaker.record_failure()
+                raise
+        else:
+            # Errors while relaying the body are not retried, it may already be partly sent
+            observe_upstream(service, request.method, upstream_outcome(response.status), started)
+            async with response:
+                if response.status not in FAILURE_STATUSES:
+                    breaker.record_success()
+                    return await upstream_response(request, response)
+                if not can_retry(request.method, attempt):
+                    breaker.record_failure()
+                    return await upstream_response(request, response)
+
+        await asyncio.sleep(backoff_delay(attempt))
+        attempt += 1
+
+def proxy_route(service, auth_required=False, forward_auth=False, invalidates=()):
+    """Build a handler that proxies the request path unchanged to an upstream"""
+    async def handler(request):
+        if auth_required:
+            denied = await check_auth(request)
+            if denied is not None:
+                return denied
+
+        headers = None
+        if forward_auth and request.headers.get("Authorization"):
+            headers = {"Authorization": request.headers["Authorization"]}
+
+        response = await proxy_request(service, request, headers=headers)
+        invalidate_responses(*invalidates)
+        return response
+
+    return handler
+
+def cached_route(service):
+    """Build a handler for a public GET served through the shared response cache"""
+    async def handler(request):
+        key = request.path_qs
+        entry = response_cache.get(key)
+        cache_status = "HIT"
+
+        if entry is None:
+            cache_status = "MISS"
+            generation = response_cache.generation
+            response = await proxy_request(service, request)
+            # Errors, streamed bodies and encoded bodies go straight back uncached
+            if response.status != 200 or type(response) is not web.Response or "Content-Encoding" in response.headers:
+                return response
+            body = response.body
+            entry = (body, response.headers["Content-Type"], make_etag(body))
+            response_cache.set(key, entry, response_cache_ttl(request.path), generation=generation)
+
+        body, content_type, etag = entry
+        if any(tag.value in (etag, "*") for tag in request.if_none_match or ()):
+            response = web.Response(status=304)
+        else:
+            response = web.Response(body=body, headers={"Content-Type": content_type})
+        response.etag = etag
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Cache"] = cache_status
+        return response
+
+    return handler
+
+async def auth_logout(request):
+    response = await proxy_route("auth", forward_auth=True)(request)
+    if request.headers.get("Authorization"):
+        forget_token(request.headers["Authorization"])
+    return response
+
+# ==========================================
+# HEALTH CHECK
+# ==========================================
+async def check_service(service_name):
+    """Return (name, status dict, healthy) for one upstream"""
+    try:
+        async with sessions[service_name].get(
+            f"{UPSTREAMS[service_name]}/health",
+            timeout=client_timeout("/health")
+        ) as response:
+            status = {
+                "status": "healthy" if response.status == 200 else "unhealthy",
+                "code": response.status
+            }
+            return service_name, status, response.status == 200
+    except Exception as e:
+        return service_name, {"status": "unhealthy", "error": str(e) or type(e).__name__}, False
+
+async def health(request):
+    # All upstreams are checked concurrently
+    results = await asyncio.gather(*(check_service(name) for name in UPSTREAMS))
+
+    services_status = {name: status for name, status, _ in results}
+    all_healthy = all(healthy for _, _, healthy in results)
+
+    return web.json_response({
+        "gateway": "healthy",
+        "mode": "async",
+        "services": services_status,
+        "auth_cache": token_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "coalescing": coalescer.stats(),
+        **resilience_stats(),
+        "overall": "healthy" if all_healthy else "degraded"
+    }, status=200 if all_healthy else 503)
+
+async def metrics(request):
+    return web.Response(body=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+# ==========================================
+# BATCH ENDPOINT
+# ==========================================
+async def run_sub_request(sub, auth_header):
+    """Dispatch one sub-request over loopback, so it passes through every gateway route check"""
+    try:
+        async with sessions[BATCH_SESSION].request(
+            str(sub.get("method", "GET")).upper(),
+            sub["path"],
+            json=sub.get("body"),
+            headers=sub_request_headers(sub, auth_header)
+        ) as response:
+            data = await response.read()
+            return {"status": response.status, "body": decode_body(data, response.content_type)}
+    except aiohttp.ClientError as e:
+        return {"status": 500, "body": {"error": f"Sub-request failed: {str(e)}"}}
+
+async def batch(request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        payload = None
+    sub_requests, error = validate_batch(payload)
+    if error:
+        return error_response(error, 400)
+
+    auth_header = request.headers.get("Authorization")
+    tasks = [asyncio.ensure_future(run_sub_request(sub, auth_header)) for sub in sub_requests]
+    done, pending = await asyncio.wait(tasks, timeout=BATCH_TIMEOUT)
+    for task in pending:
+        task.cancel()
+
+    responses = []
+    for sub, task in zip(sub_requests, tasks):
+        result = task.result() if task in done else batch_timeout_result()
+        responses.append({"id": sub.get("id"), **result})
+
+    return web.json_response({"responses": responses})
+
+async def rooms_availability(request):
+    """Room catalog plus availability and pricing for every room on one date"""
+    date = request.query.get("date")
+    if not date:
+        return error_response("date is required", 400)
+
+    # Sub-requests go through the gateway's own routes, so the catalog is served from the
+    # response cache; availability for every room is one bulk call, made in parallel
+    catalog = asyncio.ensure_future(run_sub_request({"path": "/api/rooms"}, None))
+    availability = asyncio.ensure_future(run_sub_request({
+        "method": "POST",
+        "path": "/api/booking/availability/bulk",
+        "body": {"date": date, "rooms": "all"}
+    }, None))
+    done, pending = await asyncio.wait([catalog, availability], timeout=BATCH_TIMEOUT)
+    for task in pending:
+        task.cancel()
+
+    result = catalog.result() if catalog in done else batch_timeout_result()
+    if result["status"] != 200:
+        return web.json_response(result["body"], status=result["status"])
+    rooms = result["body"].get("rooms", [])
+
+    return web.json_response({
+        "date": date,
+        "rooms": merge_availability(rooms, availability.result() if availability in done else batch_timeout_result()),
+        "count": len(rooms)
+    })
+
+# ==========================================
+# MIDDLEWARE (metrics, CORS + JSON errors)
+# ==========================================
+@web.middleware
+async def metrics_middleware(request, handler):
+    started = time.perf_counter()
+    response = await handler(request)
+    resource = request.match_info.route.resource
+    route = resource.canonical if resource is not None else "unmatched"
+    observe_request(route, request.method, response.status, time.perf_counter() - started, request.path)
+    return response
+
+@web.middleware
+async def cors_middleware(request, handler):
+    if request.method == "OPTIONS":
+        response = web.Response()
+        response.headers["Access-Control-Allow-Methods"] = "GET, POST, PUT, DELETE, OPTIONS"
+        response.headers["Access-Control-Allow-Headers"] = request.headers.get(
+            "Access-Control-Request-Headers", "Authorization, Content-Type"
+        )
+    else:
+        try:
+            response = await handler(request)
+        except web.HTTPNotFound:
+            response = error_response("Endpoint not found", 404)
+        except web.HTTPMethodNotAllowed:
+            response = error_response("Method not allowed", 405)
+        except web.HTTPException:
+            raise
+        except Exception:
+            response = error_response("Internal server error", 500)
+
+    if not response.prepared:
+        response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+# ==========================================
+# ROUTES
+# ==========================================
+# Cached responses dropped by writes through the gateway
+ROOM_PREFIXES = ("/api/rooms",)
+BOOKING_PREFIXES = ("/api/rooms", "/api/weather/forecast/")
+
+def create_app():
+    app = web.Application(middlewares=[metrics_middleware, cors_middleware])
+    app.on_startup.append(start_sessions)
+    app.on_cleanup.append(close_sessions)
+
+    app.router.add_get("/health", health, allow_head=False)
+    app.router.add_get("/metrics", metrics, allow_head=False)
+    app.router.add_post("/api/batch", batch)
+
+    # Auth service routes (public)
+    app.router.add_post("/api/auth/register", proxy_route("auth"))
+    app.router.add_post("/api/auth/login", proxy_route("auth"))
+    app.router.add_post("/api/auth/verify", proxy_route("auth", forward_auth=True))
+    app.router.add_post("/api/auth/logout", auth_logout)
+
+    # Room service routes (public for viewing, auth for modifications)
+    app.router.add_get("/api/rooms", cached_route("room"), allow_head=False)
+    app.router.add_get("/api/rooms/availability", rooms_availability, allow_head=False)
+    app.router.add_get("/api/rooms/{room_id}", cached_route("room"), allow_head=False)
+    app.router.add_post("/api/rooms", proxy_route("room", auth_required=True, invalidates=ROOM_PREFIXES))
+    app.router.add_put("/api/rooms/{room_id}", proxy_route("room", auth_required=True, invalidates=ROOM_PREFIXES))
+    app.router.add_delete("/api/rooms/{room_id}", proxy_route("room", auth_required=True, invalidates=ROOM_PREFIXES))
+
+    # Weather service routes (public)
+    app.router.add_post("/api/weather/forecast", proxy_route("weather"))
+    app.router.add_get("/api/weather/forecast/{location}", cached_route("weather"), allow_head=False)
+    app.router.add_get("/api/weather/forecasts", proxy_route("weather"), allow_head=False)
+
+    # Booking routes (weather service, public)
+    app.router.add_post("/api/booking/check-availability", proxy_route("weather"))
+    app.router.add_post("/api/booking/availability/bulk", proxy_route("weather"))
+    app.router.add_post("/api/booking/confirm", proxy_route("weather", invalidates=BOOKING_PREFIXES))
+    app.router.add_get("/api/booking/room/{room_id}/{date}", proxy_route("weather"), allow_head=False)
+    app.router.add_get("/api/booking/calendar", proxy_route("weather"), allow_head=False)
+    app.router.add_post("/api/booking/cancel/{booking_id}", proxy_route("weather", invalidates=BOOKING_PREFIXES))
+
+    return app
+
+def main():
+    web.run_app(create_app(), host="0.0.0.0", port=GATEWAY_PORT, backlog=GATEWAY_BACKLOG, access_log=None)
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,335 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g, stream_with_context
 from flask_cors import CORS
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne, DeleteOne
+from pymongo.monitoring import CommandListener
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from collections import defaultdict
+from datetime import datetime
+import bisect
 import os
+import re
+import sys
+import json
+import queue
+import threading
+import time
 
 app = Flask(__name__)
 CORS(app)
 
+# ==========================================
+# METRICS & ACCESS LOG
+# ==========================================
+REQUEST_COUNT = Counter("http_requests_total", "HTTP requests handled", ["route", "method", "status"])
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ["route", "method"])
+MONGO_LATENCY = Histogram("mongo_command_duration_seconds", "MongoDB command latency", ["command", "outcome"])
+
+ACCESS_LOG_BATCH_SIZE = int(os.getenv("ACCESS_LOG_BATCH_SIZE", "256"))
+ACCESS_LOG_QUEUE_SIZE = int(os.getenv("ACCESS_LOG_QUEUE_SIZE", "10000"))
+
+class AccessLog:
+    """JSON-lines access log, written in batches by a background thread"""
+
+    def __init__(self, service, stream=sys.stdout):
+        self.service = service
+        self.stream = stream
+        self.entries = queue.Queue(maxsize=ACCESS_LOG_QUEUE_SIZE)
+        self.dropped = 0
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def log(self, **fields):
+        fields["ts"] = datetime.utcnow().isoformat()
+        fields["service"] = self.service
+        try:
+            self.entries.put_nowait(fields)
+        except queue.Full:
+            # Never block a request on logging
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            batch = [self.entries.get()]
+            while len(batch) < ACCESS_LOG_BATCH_SIZE:
+                try:
+                    batch.append(self.entries.get_nowait())
+                except queue.Empty:
+                    break
+            self.stream.write("".join(json.dumps(entry) + "\n" for entry in batch))
+            self.stream.flush()
+
+access_log = AccessLog("room_service")
+
+class MongoCommandTimer(CommandListener):
+    """Times every MongoDB command issued by this service"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(event.command_name, "ok").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_LATENCY.labels(event.command_name, "error").observe(event.duration_micros / 1e6)
+
+@app.before_request
+def start_timer():
+    g.start_time = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    duration = time.perf_counter() - g.get("start_time", time.perf_counter())
+    REQUEST_COUNT.labels(route, request.method, response.status_code).inc()
+    REQUEST_LATENCY.labels(route, request.method).observe(duration)
+    access_log.log(
+        method=request.method,
+        path=request.path,
+        route=route,
+        status=response.status_code,
+        duration_ms=round(duration * 1000, 2)
+    )
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
 # MongoDB connection
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://mongodb:27017/')
-client = MongoClient(MONGO_URI)
+client = MongoClient(MONGO_URI, event_listeners=[MongoCommandTimer()])
 db = client['room_db']
 rooms_collection = db['rooms']
 
+# Compound indexes for /api/rooms/search: the leading field is the most selective
+# filter a query can bring, the second narrows the range scan further
+ROOM_INDEXES = [
+    [("capacity", 1), ("price_per_hour", 1)],
+    [("price_per_hour", 1), ("capacity", 1)],
+    [("price_per_day", 1), ("capacity", 1)],
+    [("amenities", 1), ("capacity", 1)],
+    [("location_tokens", 1), ("capacity", 1)],
+    [("geo", "2dsphere"), ("capacity", 1)],
+]
+
+# Rooms are returned without storage-only fields
+ROOM_PROJECTION = {"_id": 0, "location_tokens": 0, "geo": 0}
+
+# Fields a client may write, with their accepted types
+ROOM_FIELD_TYPES = {
+    "room_id": str,
+    "name": str,
+    "location": str,
+    "capacity": int,
+    "price_per_hour": (int, float),
+    "price_per_day": (int, float),
+    "amenities": list,
+    "description": str,
+    "coordinates": dict,
+}
+ROOM_FIELDS = tuple(ROOM_FIELD_TYPES)
+REQUIRED_ROOM_FIELDS = ("room_id", "name", "location", "capacity", "price_per_hour", "price_per_day")
+
+# ==========================================
+# LOCATION TOKENS
+# ==========================================
+# "London, Canary Wharf" is stored with tokens ["london", "canary wharf", "canary", "wharf"],
+# so city/area lookups are exact matches on an indexed array instead of a regex scan
+def normalize_location(text):
+    return " ".join(text.casefold().split())
+
+def location_parts(location):
+    return [part for part in (normalize_location(part) for part in location.split(",")) if part]
+
+def location_tokens(location):
+    tokens = []
+    for part in location_parts(location):
+        for token in [part] + part.split():
+            if token not in tokens:
+                tokens.append(token)
+    return tokens
+
+def location_token_query(location):
+    parts = location_parts(location)
+    return parts[0] if len(parts) == 1 else {"$all": parts}
+
+def location_regex_query(location):
+    # Fallback for partial names; escaped so user input can't inject regex syntax
+    return {"$regex": re.escape(location), "$options": "i"}
+
+def backfill_location_tokens():
+    """Derive tokens for rooms stored before they were written with them"""
+    updates = [
+        UpdateOne({"_id": room["_id"]}, {"$set": {"location_tokens": location_tokens(room.get("location", ""))}})
+        for room in rooms_collection.find({"location_tokens": {"$exists": False}}, {"location": 1})
+    ]
+    if updates:
+        rooms_collection.bulk_write(updates, ordered=False)
+
+def ensure_indexes():
+    try:
+        rooms_collection.create_index("room_id", unique=True)
+    except OperationFailure as e:
+        print(f"Could not create unique room_id index (duplicate room_ids already stored?): {e}")
+    for keys in ROOM_INDEXES:
+        rooms_collection.create_index(keys)
+
+try:
+    ensure_indexes()
+    backfill_location_tokens()
+except Exception as e:
+    print(f"Error preparing room collection: {e}")
+
+# ==========================================
+# CATALOG SNAPSHOT
+# ==========================================
+# Reads are served from memory; the snapshot is rebuilt after writes, on change
+# notifications when Mongo supports them, and every CATALOG_REFRESH_INTERVAL seconds
+CATALOG_REFRESH_INTERVAL = float(os.getenv('CATALOG_REFRESH_INTERVAL', '30'))
+# A burst of change events (one per document in a bulk import) is drained until it
+# has been quiet for CATALOG_WATCH_DEBOUNCE seconds, for at most CATALOG_WATCH_MAX_DELAY,
+# and then answered with a single rebuild
+CATALOG_WATCH_DEBOUNCE = float(os.getenv('CATALOG_WATCH_DEBOUNCE', '0.2'))
+CATALOG_WATCH_MAX_DELAY = float(os.getenv('CATALOG_WATCH_MAX_DELAY', '5'))
+
+class CatalogSnapshot:
+    """Immutable, indexed copy of the whole room catalog"""
+
+    def __init__(self, rooms, version):
+        self.version = version
+        self.rooms = rooms
+        self.by_id = {room["room_id"]: room for room in rooms}
+        
+        # Sorted arrays for range filters, searched with bisect
+        self.by_capacity = sorted(rooms, key=lambda room: room.get("capacity", 0))
+        self.capacities = [room.get("capacity", 0) for room in self.by_capacity]
+        self.by_price = sorted(rooms, key=lambda room: room.get("price_per_hour", 0))
+        self.prices = [room.get("price_per_hour", 0) for room in self.by_price]
+        
+        self.tokens = {room["room_id"]: set(location_tokens(room.get("location", ""))) for room in rooms}
+        self.by_location = defaultdict(list)
+        for room in rooms:
+            for token in self.tokens[room["room_id"]]:
+                self.by_location[token].append(room)
+        
+        # The full listing and single rooms are serialized once per version
+        self.listing_json = app.json.dumps({"rooms": rooms, "count": len(rooms)}).encode()
+        self.room_json = {room["room_id"]: app.json.dumps(room).encode() for room in rooms}
+
+    def capacity_range(self, low, high):
+        start = bisect.bisect_left(self.capacities, low)
+        end = bisect.bisect_right(self.capacities, high)
+        return self.by_capacity[start:end]
+
+    def price_range(self, low, high):
+        start = bisect.bisect_left(self.prices, low)
+        end = bisect.bisect_right(self.prices, high)
+        return self.by_price[start:end]
+
+    def at_location(self, location):
+        parts = location_parts(location)
+        if not parts:
+            return []
+        return [
+            room for room in self.by_location.get(parts[0], [])
+            if self.tokens[room["room_id"]].issuperset(parts)
+        ]
+
+class RoomCatalog:
+    """Holds the current snapshot and swaps in a new one whenever the collection changes"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.snapshot = CatalogSnapshot([], 0)
+        # Cluster time of the read behind the current snapshot (None on a standalone server)
+        self.read_time = None
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        with self.lock:
+            with self.collection.database.client.start_session(causal_consistency=False) as session:
+                rooms = list(self.collection.find({}, ROOM_PROJECTION, session=session).sort("_id", 1))
+                read_time = session.operation_time
+            self.snapshot = CatalogSnapshot(rooms, self.snapshot.version + 1)
+            self.read_time = read_time
+            return self.snapshot
+
+    def covers(self, cluster_time):
+        """Whether the current snapshot was read after a change at cluster_time"""
+        read_time = self.read_time
+        return read_time is not None and cluster_time is not None and cluster_time <= read_time
+
+    def watch(self):
+        # Change streams need a replica set; a standalone server falls back to polling
+        with self.collection.watch(max_await_time_ms=int(CATALOG_WATCH_DEBOUNCE * 1000)) as stream:
+            self.refresh()
+            while stream.alive:
+                change = stream.try_next()
+                if change is None:
+                    continue
+                latest = change.get("clusterTime")
+                
+                deadline = time.monotonic() + CATALOG_WATCH_MAX_DELAY
+                while time.monotonic() < deadline:
+                    change = stream.try_next()
+                    if change is None:
+                        break
+                    latest = change.get("clusterTime", latest)
+                
+                # Writes made through this service have usually rebuilt the snapshot already
+                if not self.covers(latest):
+                    self.refresh()
+
+    def run(self):
+        while True:
+            try:
+                self.watch()
+            except OperationFailure:
+                break
+            except Exception as e:
+                print(f"Error watching room catalog: {e}")
+                time.sleep(CATALOG_REFRESH_INTERVAL)
+        
+        while True:
+            time.sleep(CATALOG_REFRESH_INTERVAL)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing room catalog: {e}")
+
+catalog = RoomCatalog(rooms_collection)
+try:
+    catalog.refresh()
+except Exception as e:
+    print(f"Error loading room catalog: {e}")
+threading.Thread(target=catalog.run, daemon=True).start()
+
+def json_bytes_response(body, status=200):
+    response = Response(body, status=status, mimetype='application/json')
+    response.headers['X-Catalog-Version'] = str(catalog.snapshot.version)
+    return response
+
 # Health check endpoint
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({"message": "Room service is running on port 85"}), 200
+    snapshot = catalog.snapshot
+    return jsonify({
+        "message": "Room service is running on port 85",
+        "catalog": {"version": snapshot.version, "rooms": len(snapshot.rooms)}
+    }), 200
 
 # Get all rooms
 @app.route('/api/rooms', methods=['GET'])
 def get_rooms():
-    rooms = list(rooms_collection.find({}, {"_id": 0}))
-    return jsonify({"rooms": rooms, "count": len(rooms)}), 200
+    return json_bytes_response(catalog.snapshot.listing_json)
 
 # Get room by ID
 @app.route('/api/rooms/<room_id>', methods=['GET'])
 def get_room(room_id):
-    room = rooms_collection.find_one({"room_id": room_id}, {"_id": 0})
+    room = catalog.snapshot.room_json.get(room_id)
     if not room:
         return jsonify({"error": "Room not found"}), 404
-    return jsonify(room), 200
+    return json_bytes_response(room)
 
 # Filter rooms by capacity
 @app.route('/api/rooms/filter/capacity', methods=['GET'])
@@ -37,9 +337,7 @@ def filter_by_capacity():
     min_capacity = request.args.get('min', type=int, default=0)
     max_capacity = request.args.get('max', type=int, default=1000)
     
-    rooms = list(rooms_collection.find({
-        "capacity": {"$gte": min_capacity, "$lte": max_capacity}
-    }, {"_id": 0}))
+    rooms = catalog.snapshot.capacity_range(min_capacity, max_capacity)
     
     return jsonify({"rooms": rooms, "count": len(rooms)}), 200
 
@@ -50,9 +348,12 @@ def filter_by_location():
     if not location:
         return jsonify({"error": "Location parameter required"}), 400
     
-    rooms = list(rooms_collection.find({
-        "location": {"$regex": location, "$options": "i"}
-    }, {"_id": 0}))
+    snapshot = catalog.snapshot
+    rooms = snapshot.at_location(location)
+    if not rooms:
+        # Partial names like "Canary W" don't match a whole token
+        needle = normalize_location(location)
+        rooms = [room for room in snapshot.rooms if needle in normalize_location(room.get("location", ""))]
     
     return jsonify({"rooms": rooms, "count": len(rooms)}), 200
 
@@ -62,12 +363,396 @@ def filter_by_price():
     min_price = request.args.get('min', type=float, default=0)
     max_price = request.args.get('max', type=float, default=10000)
     
-    rooms = list(rooms_collection.find({
-        "price_per_hour": {"$gte": min_price, "$lte": max_price}
-    }, {"_id": 0}))
+    rooms = catalog.snapshot.price_range(min_price, max_price)
     
     return jsonify({"rooms": rooms, "count": len(rooms)}), 200
 
+# ==========================================
+# SEARCH
+# ==========================================
+SEARCH_DEFAULT_LIMIT = int(os.getenv('SEARCH_DEFAULT_LIMIT', '50'))
+SEARCH_MAX_LIMIT = int(os.getenv('SEARCH_MAX_LIMIT', '500'))
+PRICE_FIELDS = {"hour": "price_per_hour", "day": "price_per_day"}
+SORT_FIELDS = ("capacity", "price", "name")
+
+def range_filter(low, high):
+    bounds = {}
+    if low is not None:
+        bounds["$gte"] = low
+    if high is not None:
+        bounds["$lte"] = high
+    return bounds
+
+def search_query(args):
+    """Build (query, sort) from search parameters, or raise ValueError with a message for the client"""
+    price_field = PRICE_FIELDS.get(args.get('price_per', 'hour'))
+    if not price_field:
+        raise ValueError("price_per must be 'hour' or 'day'")
+    
+    query = {}
+    capacity = range_filter(args.get('min_capacity', type=int), args.get('max_capacity', type=int))
+    if capacity:
+        query["capacity"] = capacity
+    price = range_filter(args.get('min_price', type=float), args.get('max_price', type=float))
+    if price:
+        query[price_field] = price
+    
+    location = args.get('location', type=str)
+    if location:
+        query["location_tokens"] = location_token_query(location)
+    
+    amenities = [amenity.strip() for amenity in args.get('amenities', '').split(",") if amenity.strip()]
+    if amenities:
+        query["amenities"] = {"$all": amenities}
+    
+    sort = None
+    sort_by = args.get('sort')
+    if sort_by:
+        field = sort_by.lstrip("-")
+        if field not in SORT_FIELDS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_FIELDS)}, optionally prefixed with '-'")
+        field = price_field if field == "price" else field
+        sort = [(field, -1 if sort_by.startswith("-") else 1)]
+    
+    return query, sort
+
+def find_index_name(plan):
+    """First index named in an explain plan, or None for a collection scan"""
+    if "indexName" in plan:
+        return plan["indexName"]
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            name = find_index_name(child)
+            if name:
+                return name
+    return None
+
+def explain_summary(cursor):
+    explain = cursor.explain()
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    stats = explain.get("executionStats", {})
+    return {
+        "index": find_index_name(winning_plan),
+        "winning_plan": winning_plan,
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "returned": stats.get("nReturned"),
+        "execution_ms": stats.get("executionTimeMillis")
+    }
+
+# Search rooms by any combination of capacity, price, location and amenities
+@app.route('/api/rooms/search', methods=['GET'])
+def search_rooms():
+    try:
+        query, sort = search_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    limit = max(1, min(request.args.get('limit', type=int, default=SEARCH_DEFAULT_LIMIT), SEARCH_MAX_LIMIT))
+    
+    def run(query):
+        cursor = rooms_collection.find(query, ROOM_PROJECTION).limit(limit)
+        return cursor.sort(sort) if sort else cursor
+    
+    started = time.perf_counter()
+    cursor = run(query)
+    rooms = list(cursor)
+    location_match = "token" if "location_tokens" in query else None
+    if not rooms and location_match:
+        query.pop("location_tokens")
+        query["location"] = location_regex_query(request.args['location'])
+        cursor = run(query)
+        rooms = list(cursor)
+        location_match = "regex"
+    
+    result = {
+        "rooms": rooms,
+        "count": len(rooms),
+        "took_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+    if location_match:
+        result["location_match"] = location_match
+    
+    # explain=true reports the chosen index and how much of it was scanned, for tuning
+    if request.args.get('explain') == 'true':
+        result["explain"] = explain_summary(cursor.clone())
+    
+    return jsonify(result), 200
+
+# ==========================================
+# BATCH LOOKUP
+# ==========================================
+ROOM_BATCH_MAX = int(os.getenv('ROOM_BATCH_MAX', '500'))
+
+def lookup_rooms(room_ids, fields):
+    """Fetch rooms with one $in query, in the order requested, plus the IDs that don't exist"""
+    room_ids = list(dict.fromkeys(room_ids))
+    projection = {field: 1 for field in fields} if fields else dict(ROOM_PROJECTION)
+    if fields:
+        projection.update({"_id": 0, "room_id": 1})
+    
+    found = {room["room_id"]: room for room in rooms_collection.find({"room_id": {"$in": room_ids}}, projection)}
+    rooms = [found[room_id] for room_id in room_ids if room_id in found]
+    missing = [room_id for room_id in room_ids if room_id not in found]
+    return rooms, missing
+
+# Many rooms in one call: POST {"ids": [...], "fields": [...]} or GET ?ids=LON001,MAN002&fields=name
+@app.route('/api/rooms/batch', methods=['GET', 'POST'])
+def batch_rooms():
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        room_ids = data.get('ids')
+        fields = data.get('fields') or []
+    else:
+        room_ids = [room_id for room_id in request.args.get('ids', '').split(",") if room_id]
+        fields = [field for field in request.args.get('fields', '').split(",") if field]
+    
+    if not room_ids or not isinstance(room_ids, list) or not all(isinstance(room_id, str) for room_id in room_ids):
+        return jsonify({"error": "ids must be a non-empty list of room IDs"}), 400
+    if len(room_ids) > ROOM_BATCH_MAX:
+        return jsonify({"error": f"At most {ROOM_BATCH_MAX} rooms per batch"}), 400
+    if not isinstance(fields, list) or any(field not in ROOM_FIELDS for field in fields):
+        return jsonify({"error": f"fields must be a subset of {', '.join(ROOM_FIELDS)}"}), 400
+    
+    rooms, missing = lookup_rooms(room_ids, fields)
+    return jsonify({"rooms": rooms, "count": len(rooms), "missing": missing}), 200
+
+# ==========================================
+# GEOSPATIAL
+# ==========================================
+# Clients read and write "coordinates": {"lat", "lng"}; the GeoJSON point behind the
+# 2dsphere index is stored alongside as "geo"
+NEAR_DEFAULT_LIMIT = int(os.getenv('NEAR_DEFAULT_LIMIT', '10'))
+
+def parse_point(lat, lng):
+    """GeoJSON point for a latitude/longitude pair, or None if either is out of range"""
+    valid = all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in (lat, lng))
+    if not valid or not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        return None
+    return {"type": "Point", "coordinates": [lng, lat]}
+
+def near_pipeline(point, query, radius_km, limit):
+    geo_near = {"near": point, "distanceField": "distance_m", "key": "geo", "spherical": True, "query": query}
+    if radius_km is not None:
+        geo_near["maxDistance"] = radius_km * 1000
+    return [{"$geoNear": geo_near}, {"$limit": limit}, {"$project": ROOM_PROJECTION}]
+
+# Nearest rooms to a point, optionally within radius_km, combined with the search filters
+@app.route('/api/rooms/near', methods=['GET'])
+def rooms_near():
+    point = parse_point(request.args.get('lat', type=float), request.args.get('lng', type=float))
+    if point is None:
+        return jsonify({"error": "Valid lat and lng parameters required"}), 400
+    
+    try:
+        query, sort = search_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if sort:
+        return jsonify({"error": "Results near a point are always sorted by distance"}), 400
+    
+    radius_km = request.args.get('radius_km', type=float)
+    if radius_km is not None and radius_km <= 0:
+        return jsonify({"error": "radius_km must be positive"}), 400
+    limit = max(1, min(request.args.get('limit', type=int, default=NEAR_DEFAULT_LIMIT), SEARCH_MAX_LIMIT))
+    
+    started = time.perf_counter()
+    rooms = list(rooms_collection.aggregate(near_pipeline(point, query, radius_km, limit)))
+    for room in rooms:
+        room["distance_km"] = round(room.pop("distance_m") / 1000, 3)
+    
+    return jsonify({
+        "rooms": rooms,
+        "count": len(rooms),
+        "took_ms": round((time.perf_counter() - started) * 1000, 2)
+    }), 200
+
+# ==========================================
+# WRITES
+# ==========================================
+# Single-room routes and bulk imports share one path: validated rows become bulk
+# operations keyed on room_id, applied unordered, then the catalog snapshot is rebuilt
+ROOM_IMPORT_BATCH_SIZE = int(os.getenv('ROOM_IMPORT_BATCH_SIZE', '1000'))
+
+def room_error(room, partial=False):
+    """Return a message describing what is wrong with a room document, or None"""
+    if not isinstance(room, dict):
+        return "Room must be a JSON object"
+    
+    unknown = [field for field in room if field not in ROOM_FIELD_TYPES]
+    if unknown:
+        return f"Unknown fields: {', '.join(unknown)}"
+    
+    missing = [] if partial else [field for field in REQUIRED_ROOM_FIELDS if field not in room]
+    if missing:
+        return f"Missing fields: {', '.join(missing)}"
+    
+    for field, value in room.items():
+        if isinstance(value, bool) or not isinstance(value, ROOM_FIELD_TYPES[field]):
+            return f"Invalid value for {field}"
+    if not all(isinstance(amenity, str) for amenity in room.get("amenities", [])):
+        return "Invalid value for amenities"
+    if "coordinates" in room and parse_point(room["coordinates"].get("lat"), room["coordinates"].get("lng")) is None:
+        return 'coordinates must be {"lat": -90..90, "lng": -180..180}'
+    return None
+
+def room_changes(room):
+    changes = dict(room)
+    if "location" in changes:
+        changes["location_tokens"] = location_tokens(changes["location"])
+    if "coordinates" in changes:
+        changes["geo"] = parse_point(changes["coordinates"]["lat"], changes["coordinates"]["lng"])
+    return changes
+
+def room_upsert(room):
+    return UpdateOne({"room_id": room["room_id"]}, {"$set": room_changes(room)}, upsert=True)
+
+def write_rooms(operations):
+    """Apply operations in one unordered bulk write; returns (counts, write errors)"""
+    try:
+        details = rooms_collection.bulk_write(operations, ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        details = e.details
+    
+    counts = {
+        "inserted": details["nInserted"] + details["nUpserted"],
+        "updated": details["nModified"],
+        "unchanged": details["nMatched"] - details["nModified"],
+        "deleted": details["nRemoved"]
+    }
+    return counts, details["writeErrors"]
+
+def import_batch(number, rows, invalid):
+    """Upsert one batch of (line, room) rows and describe the outcome"""
+    try:
+        counts, errors = write_rooms([room_upsert(room) for _, room in rows]) if rows else ({}, [])
+    except PyMongoError as e:
+        # Which rows landed is unknown, so the whole batch is reported failed; upserts are safe to resend
+        counts, errors = {}, [{"index": index, "errmsg": f"Write failed: {e}"} for index in range(len(rows))]
+    return {
+        "batch": number,
+        "received": len(rows) + len(invalid),
+        "inserted": counts.get("inserted", 0),
+        "updated": counts.get("updated", 0),
+        "unchanged": counts.get("unchanged", 0),
+        "invalid": invalid,
+        "failed": [{"line": rows[error["index"]][0], "error": error["errmsg"]} for error in errors]
+    }
+
+def import_results(lines):
+    totals = {"received": 0, "inserted": 0, "updated": 0, "unchanged": 0, "invalid": 0, "failed": 0}
+    rows, invalid, number = [], [], 0
+    
+    def finish_batch():
+        result = import_batch(number, rows, invalid)
+        for key in ("received", "inserted", "updated", "unchanged"):
+            totals[key] += result[key]
+        totals["invalid"] += len(result["invalid"])
+        totals["failed"] += len(result["failed"])
+        return json.dumps(result) + "\n"
+    
+    for line, raw in enumerate(lines, start=1):
+        if not raw.strip():
+            continue
+        try:
+            room = json.loads(raw)
+        except ValueError:
+            invalid.append({"line": line, "error": "Invalid JSON"})
+        else:
+            error = room_error(room)
+            if error:
+                invalid.append({"line": line, "error": error})
+            else:
+                rows.append((line, room))
+        
+        if len(rows) + len(invalid) >= ROOM_IMPORT_BATCH_SIZE:
+            number += 1
+            yield finish_batch()
+            rows, invalid = [], []
+    
+    if rows or invalid:
+        number += 1
+        yield finish_batch()
+    
+    # One rebuild for the whole import rather than one per batch
+    if totals["inserted"] or totals["updated"]:
+        try:
+            catalog.refresh()
+        except PyMongoError as e:
+            # The change stream or the next write picks the import up; the summary still goes out
+            print(f"Error refreshing room catalog after import: {e}")
+    
+    yield json.dumps({"summary": totals}) + "\n"
+
+# Bulk upsert rooms from NDJSON, one room per line, keyed on room_id
+@app.route('/api/rooms/import', methods=['POST'])
+def import_rooms():
+    return Response(stream_with_context(import_results(request.stream)), mimetype='application/x-ndjson')
+
+# Create room
+@app.route('/api/rooms', methods=['POST'])
+def create_room():
+    room = request.get_json(silent=True)
+    error = room_error(room)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    # $setOnInsert leaves an existing room untouched, so a conflict shows up as a match
+    counts, errors = write_rooms([
+        UpdateOne({"room_id": room["room_id"]}, {"$setOnInsert": room_changes(room)}, upsert=True)
+    ])
+    if errors or not counts["inserted"]:
+        return jsonify({"error": "Room already exists"}), 409
+    
+    snapshot = catalog.refresh()
+    return jsonify(snapshot.by_id[room["room_id"]]), 201
+
+# Update room
+@app.route('/api/rooms/<room_id>', methods=['PUT'])
+def update_room(room_id):
+    changes = request.get_json(silent=True)
+    error = room_error(changes, partial=True)
+    if error:
+        return jsonify({"error": error}), 400
+    if not changes:
+        return jsonify({"error": "No fields to update"}), 400
+    if changes.get("room_id", room_id) != room_id:
+        return jsonify({"error": "room_id cannot be changed"}), 400
+    
+    counts, _ = write_rooms([UpdateOne({"room_id": room_id}, {"$set": room_changes(changes)})])
+    if not counts["updated"] and not counts["unchanged"]:
+        return jsonify({"error": "Room not found"}), 404
+    
+    snapshot = catalog.refresh()
+    return jsonify(snapshot.by_id[room_id]), 200
+
+# Delete room
+@app.route('/api/rooms/<room_id>', methods=['DELETE'])
+def delete_room(room_id):
+    counts, _ = write_rooms([DeleteOne({"room_id": room_id})])
+    if not counts["deleted"]:
+        return jsonify({"error": "Room not found"}), 404
+    
+    catalog.refresh()
+    return jsonify({"message": "Room deleted successfully", "room_id": room_id}), 200
+
+# Location autocomplete: /api/rooms/locations?prefix=Man
+LOCATION_SUGGESTIONS_LIMIT = int(os.getenv('LOCATION_SUGGESTIONS_LIMIT', '10'))
+
+@app.route('/api/rooms/locations', methods=['GET'])
+def location_suggestions():
+    prefix = normalize_location(request.args.get('prefix', type=str, default=''))
+    if not prefix:
+        return jsonify({"error": "Prefix parameter required"}), 400
+    
+    limit = max(1, min(request.args.get('limit', type=int, default=LOCATION_SUGGESTIONS_LIMIT), 100))
+    # An anchored, case-sensitive prefix on the lowercased tokens is an index range scan
+    locations = rooms_collection.distinct("location", {"location_tokens": {"$regex": "^" + re.escape(prefix)}})
+    
+    return jsonify({"prefix": prefix, "locations": sorted(locations)[:limit]}), 200
+
 # Initialize database with sample rooms
 @app.route('/api/rooms/seed', methods=['POST'])
 def seed_rooms():
@@ -81,6 +766,7 @@ def seed_rooms():
             "room_id": "LON001",
             "name": "The Churchill Room",
             "location": "London, Westminster",
+            "coordinates": {"lat": 51.4995, "lng": -0.1248},
             "capacity": 50,
             "price_per_hour": 150.00,
             "price_per_day": 1000.00,
@@ -91,6 +777,7 @@ def seed_rooms():
             "room_id": "LON002",
             "name": "Thames View Conference Hall",
             "location": "London, South Bank",
+            "coordinates": {"lat": 51.5055, "lng": -0.116},
             "capacity": 200,
             "price_per_hour": 350.00,
             "price_per_day": 2500.00,
@@ -101,6 +788,7 @@ def seed_rooms():
             "room_id": "LON003",
             "name": "The Boardroom at Canary Wharf",
             "location": "London, Canary Wharf",
+            "coordinates": {"lat": 51.5054, "lng": -0.0235},
             "capacity": 20,
             "price_per_hour": 200.00,
             "price_per_day": 1400.00,
@@ -111,6 +799,7 @@ def seed_rooms():
             "room_id": "MAN001",
             "name": "Northern Innovation Hub",
             "location": "Manchester, City Centre",
+            "coordinates": {"lat": 53.4808, "lng": -2.2426},
             "capacity": 100,
             "price_per_hour": 120.00,
             "price_per_day": 850.00,
@@ -121,6 +810,7 @@ def seed_rooms():
             "room_id": "MAN002",
             "name": "Media City Conference Room",
             "location": "Manchester, Salford Quays",
+            "coordinates": {"lat": 53.4722, "lng": -2.2935},
             "capacity": 75,
             "price_per_hour": 100.00,
             "price_per_day": 700.00,
@@ -131,6 +821,7 @@ def seed_rooms():
             "room_id": "BIR001",
             "name": "Bullring Business Suite",
             "location": "Birmingham, City Centre",
+            "coordinates": {"lat": 52.4776, "lng": -1.8946},
             "capacity": 40,
             "price_per_hour": 80.00,
             "price_per_day": 550.00,
@@ -141,6 +832,7 @@ def seed_rooms():
             "room_id": "EDI001",
             "name": "Edinburgh Castle View Room",
             "location": "Edinburgh, Old Town",
+            "coordinates": {"lat": 55.9486, "lng": -3.1999},
             "capacity": 60,
             "price_per_hour": 110.00,
             "price_per_day": 800.00,
@@ -151,6 +843,7 @@ def seed_rooms():
             "room_id": "EDI002",
             "name": "Scottish Parliament Conference Hall",
             "location": "Edinburgh, Holyrood",
+            "coordinates": {"lat": 55.952, "lng": -3.1757},
             "capacity": 150,
             "price_per_hour": 180.00,
             "price_per_day": 1300.00,
@@ -161,6 +854,7 @@ def seed_rooms():
             "room_id": "GLA001",
             "name": "Clyde Riverside Meeting Room",
             "location": "Glasgow, City Centre",
+            "coordinates": {"lat": 55.858, "lng": -4.259},
             "capacity": 30,
             "price_per_hour": 75.00,
             "price_per_day": 500.00,
@@ -171,6 +865,7 @@ def seed_rooms():
             "room_id": "BRI001",
             "name": "Harbourside Innovation Centre",
             "location": "Bristol, Harbourside",
+            "coordinates": {"lat": 51.45, "lng": -2.6},
             "capacity": 80,
             "price_per_hour": 95.00,
             "price_per_day": 650.00,
@@ -181,6 +876,7 @@ def seed_rooms():
             "room_id": "LEE001",
             "name": "Yorkshire Business Hub",
             "location": "Leeds, City Centre",
+            "coordinates": {"lat": 53.7997, "lng": -1.5492},
             "capacity": 45,
             "price_per_hour": 70.00,
             "price_per_day": 480.00,
@@ -191,6 +887,7 @@ def seed_rooms():
             "room_id": "LIV001",
             "name": "Albert Dock Conference Suite",
             "location": "Liverpool, Albert Dock",
+            "coordinates": {"lat": 53.3995, "lng": -2.992},
             "capacity": 120,
             "price_per_hour": 130.00,
             "price_per_day": 900.00,
@@ -199,11 +896,12 @@ def seed_rooms():
         }
     ]
     
-    rooms_collection.insert_many(uk_rooms)
+    counts, _ = write_rooms([room_upsert(room) for room in uk_rooms])
+    catalog.refresh()
     
     return jsonify({
         "message": "Database seeded successfully",
-        "rooms_added": len(uk_rooms)
+        "rooms_added": counts["inserted"]
     }), 201
 
 if __name__ == '__main__':
@@ -0,0 +1,94 @@
+import argparse
+import os
+import random
+import statistics
+import time
+
+from pymongo import MongoClient
+
+# Times "rooms near me" queries against a synthetic catalog in a scratch database.
+# Usage: python benchmark_near.py --rooms 100000 --queries 200
+# The catalog is built with the same indexes and $geoNear pipeline as room_service.
+
+# Rough bounding box of Great Britain
+LAT_RANGE = (50.0, 58.5)
+LNG_RANGE = (-5.5, 1.5)
+AMENITIES = ["Projector", "Video Conference", "Whiteboard", "WiFi", "Stage", "Catering"]
+
+def synthetic_room(index):
+    lat = random.uniform(*LAT_RANGE)
+    lng = random.uniform(*LNG_RANGE)
+    price_per_hour = random.randint(40, 400)
+    return {
+        "room_id": f"BENCH{index:06d}",
+        "name": f"Benchmark Room {index}",
+        "location": "Benchmark, Synthetic",
+        "coordinates": {"lat": lat, "lng": lng},
+        "geo": {"type": "Point", "coordinates": [lng, lat]},
+        "capacity": random.randint(4, 300),
+        "price_per_hour": price_per_hour,
+        "price_per_day": price_per_hour * 7,
+        "amenities": random.sample(AMENITIES, 3)
+    }
+
+def build_catalog(collection, rooms, batch_size=5000):
+    collection.drop()
+    for start in range(0, rooms, batch_size):
+        collection.insert_many([synthetic_room(index) for index in range(start, min(start + batch_size, rooms))])
+    collection.create_index("room_id", unique=True)
+    collection.create_index([("geo", "2dsphere"), ("capacity", 1)])
+
+def near_pipeline(point, query, radius_km, limit):
+    geo_near = {"near": point, "distanceField": "distance_m", "key": "geo", "spherical": True, "query": query}
+    if radius_km is not None:
+        geo_near["maxDistance"] = radius_km * 1000
+    return [{"$geoNear": geo_near}, {"$limit": limit}, {"$project": {"_id": 0, "geo": 0}}]
+
+def time_queries(collection, queries, query, radius_km, limit):
+    timings = []
+    returned = 0
+    for _ in range(queries):
+        point = {"type": "Point", "coordinates": [random.uniform(*LNG_RANGE), random.uniform(*LAT_RANGE)]}
+        started = time.perf_counter()
+        returned += len(list(collection.aggregate(near_pipeline(point, query, radius_km, limit))))
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50": statistics.median(timings),
+        "p95": timings[int(len(timings) * 0.95) - 1],
+        "avg_returned": returned / queries
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Geospatial room search benchmark")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGO_URI", "mongodb://localhost:27017/"))
+    parser.add_argument("--database", default="room_benchmark")
+    parser.add_argument("--rooms", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="Keep the synthetic catalog afterwards")
+    args = parser.parse_args()
+
+    random.seed(42)
+    client = MongoClient(args.mongo_uri)
+    collection = client[args.database]["rooms"]
+
+    started = time.perf_counter()
+    build_catalog(collection, args.rooms)
+    print(f"Built {args.rooms} rooms in {time.perf_counter() - started:.1f}s")
+
+    scenarios = [
+        ("nearest 10", {}, None, 10),
+        ("nearest 10, 40+ seats", {"capacity": {"$gte": 40}}, None, 10),
+        ("within 5 km", {}, 5, 100),
+        ("within 25 km, 40+ seats, under 200/h", {"capacity": {"$gte": 40}, "price_per_hour": {"$lte": 200}}, 25, 100),
+    ]
+    for name, query, radius_km, limit in scenarios:
+        result = time_queries(collection, args.queries, query, radius_km, limit)
+        print(f"{name:<40} p50 {result['p50']:7.2f} ms  p95 {result['p95']:7.2f} ms  "
+              f"avg rooms {result['avg_returned']:6.1f}")
+
+    if not args.keep:
+        client.drop_database(args.database)
+
+if __name__ == "__main__":
+    main()
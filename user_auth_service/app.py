@@ -1,19 +1,403 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g, stream_with_context
 from flask_cors import CORS
 from pymongo import MongoClient
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from pymongo.monitoring import CommandListener
+from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from collections import OrderedDict
+from datetime import datetime
+from passwords import PasswordHasher, PoolSaturated
+import jwt
+import base64
 import os
+import sys
+import json
+import queue
+import secrets
+import threading
+import time
 
 app = Flask(__name__)
 CORS(app)
 
+# ==========================================
+# METRICS & ACCESS LOG
+# ==========================================
+REQUEST_COUNT = Counter("http_requests_total", "HTTP requests handled", ["route", "method", "status"])
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ["route", "method"])
+MONGO_LATENCY = Histogram("mongo_command_duration_seconds", "MongoDB command latency", ["command", "outcome"])
+
+ACCESS_LOG_BATCH_SIZE = int(os.getenv("ACCESS_LOG_BATCH_SIZE", "256"))
+ACCESS_LOG_QUEUE_SIZE = int(os.getenv("ACCESS_LOG_QUEUE_SIZE", "10000"))
+
+class AccessLog:
+    """JSON-lines access log, written in batches by a background thread"""
+
+    def __init__(self, service, stream=sys.stdout):
+        self.service = service
+        self.stream = stream
+        self.entries = queue.Queue(maxsize=ACCESS_LOG_QUEUE_SIZE)
+        self.dropped = 0
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def log(self, **fields):
+        fields["ts"] = datetime.utcnow().isoformat()
+        fields["service"] = self.service
+        try:
+            self.entries.put_nowait(fields)
+        except queue.Full:
+            # Never block a request on logging
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            batch = [self.entries.get()]
+            while len(batch) < ACCESS_LOG_BATCH_SIZE:
+                try:
+                    batch.append(self.entries.get_nowait())
+                except queue.Empty:
+                    break
+            self.stream.write("".join(json.dumps(entry) + "\n" for entry in batch))
+            self.stream.flush()
+
+access_log = AccessLog("user_auth_service")
+
+class MongoCommandTimer(CommandListener):
+    """Times every MongoDB command issued by this service"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(event.command_name, "ok").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_LATENCY.labels(event.command_name, "error").observe(event.duration_micros / 1e6)
+
+@app.before_request
+def start_timer():
+    g.start_time = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    duration = time.perf_counter() - g.get("start_time", time.perf_counter())
+    REQUEST_COUNT.labels(route, request.method, response.status_code).inc()
+    REQUEST_LATENCY.labels(route, request.method).observe(duration)
+    access_log.log(
+        method=request.method,
+        path=request.path,
+        route=route,
+        status=response.status_code,
+        duration_ms=round(duration * 1000, 2)
+    )
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
 # MongoDB connection
 MONGO_URI = os.getenv('MONGO_URI', 'mongodb://mongodb:27017/')
-client = MongoClient(MONGO_URI)
+client = MongoClient(MONGO_URI, event_listeners=[MongoCommandTimer()])
 db = client['auth_db']
 users_collection = db['users']
 
-# Logged in users (stores tokens in memory)
-logged_in_users = {}
+# Registration relies on this index to reject duplicate emails in a single insert. If it
+# can't be built (duplicate emails already stored), writes check for the email first instead.
+try:
+    users_collection.create_index("email", unique=True)
+    EMAIL_INDEX_READY = True
+except OperationFailure as e:
+    EMAIL_INDEX_READY = False
+    print(f"Could not create unique email index (duplicate emails already stored?), "
+          f"falling back to checking emails before inserts: {e}")
+
+# ==========================================
+# SIGNED TOKENS
+# ==========================================
+# "kid:secret" pairs; the first key signs new tokens, the others still verify during rotation.
+# Entries without a secret are ignored rather than turned into an empty HMAC key.
+def parse_signing_keys(value):
+    keys = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        kid, _, secret = item.partition(":")
+        if kid and secret:
+            keys[kid] = secret
+    return keys
+
+SIGNING_KEYS = parse_signing_keys(os.getenv('AUTH_SIGNING_KEYS', ''))
+# There is no built-in key: a default shipped with the code would let anyone mint tokens
+if not SIGNING_KEYS and os.getenv('AUTH_TOKEN_MODE', 'signed') == 'signed':
+    sys.exit("AUTH_SIGNING_KEYS must be set to at least one \"kid:secret\" pair, "
+             "e.g. AUTH_SIGNING_KEYS=\"k1:$(openssl rand -hex 32)\"")
+ACTIVE_KEY_ID = next(iter(SIGNING_KEYS), None)
+TOKEN_TTL = int(os.getenv('AUTH_TOKEN_TTL', '43200'))
+REVOCATION_REFRESH_INTERVAL = float(os.getenv('REVOCATION_REFRESH_INTERVAL', '5'))
+
+EPOCH = datetime(1970, 1, 1)
+
+revoked_tokens_collection = db['revoked_tokens']
+# Revocations only need to outlive the token they revoke
+revoked_tokens_collection.create_index("expires_at", expireAfterSeconds=0)
+
+class RevocationList:
+    """IDs of logged-out tokens that have not expired yet, synced across workers through Mongo"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.revoked = {}
+        self.lock = threading.Lock()
+
+    def revoke(self, jti, exp):
+        self.collection.update_one(
+            {"_id": jti},
+            {"$set": {"expires_at": datetime.utcfromtimestamp(exp)}},
+            upsert=True
+        )
+        with self.lock:
+            self.revoked[jti] = exp
+
+    def is_revoked(self, jti):
+        return jti in self.revoked
+
+    def refresh(self):
+        now = time.time()
+        docs = self.collection.find({"expires_at": {"$gt": datetime.utcnow()}})
+        revoked = {doc["_id"]: (doc["expires_at"] - EPOCH).total_seconds() for doc in docs}
+        with self.lock:
+            # Keep local revocations that raced the query, drop everything that expired
+            revoked.update({jti: exp for jti, exp in self.revoked.items() if exp > now})
+            self.revoked = revoked
+
+    def run(self):
+        while True:
+            time.sleep(REVOCATION_REFRESH_INTERVAL)
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Error refreshing revocation list: {e}")
+
+revocation_list = RevocationList(revoked_tokens_collection)
+threading.Thread(target=revocation_list.run, daemon=True).start()
+
+def issue_signed_token(user):
+    now = int(time.time())
+    claims = {
+        "sub": user["email"],
+        "email": user["email"],
+        "name": user["name"],
+        "iat": now,
+        "exp": now + TOKEN_TTL,
+        "jti": secrets.token_urlsafe(12)
+    }
+    return jwt.encode(claims, SIGNING_KEYS[ACTIVE_KEY_ID], algorithm="HS256", headers={"kid": ACTIVE_KEY_ID})
+
+def decode_signed_token(token):
+    """Return the token's claims, or None if it is malformed, forged, expired or revoked"""
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid not in SIGNING_KEYS:
+            return None
+        claims = jwt.decode(
+            token,
+            SIGNING_KEYS[kid],
+            algorithms=["HS256"],
+            options={"require": ["exp", "jti", "email", "name"]}
+        )
+    except jwt.InvalidTokenError:
+        return None
+    
+    if revocation_list.is_revoked(claims["jti"]):
+        return None
+    return claims
+
+# ==========================================
+# SESSION STORE (AUTH_TOKEN_MODE=session)
+# ==========================================
+# Opaque tokens backed by an expiring, shared session store instead of signed tokens
+AUTH_TOKEN_MODE = os.getenv('AUTH_TOKEN_MODE', 'signed')
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'mongo')
+SESSION_TTL = int(os.getenv('SESSION_TTL', str(TOKEN_TTL)))
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', '60'))
+SESSION_CACHE_SIZE = int(os.getenv('SESSION_CACHE_SIZE', '10000'))
+SESSION_CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', '30'))
+
+# A session is {"email", "name", "expires_at"} with expires_at as a Unix timestamp
+
+class MemorySessionStore:
+    """Process-local sessions, for tests and single-worker runs"""
+
+    def __init__(self):
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def get(self, token):
+        with self.lock:
+            session = self.sessions.get(token)
+        if session is None or session["expires_at"] <= time.time():
+            return None
+        return session
+
+    def put(self, token, session):
+        with self.lock:
+            self.sessions[token] = session
+
+    def delete(self, token):
+        with self.lock:
+            self.sessions.pop(token, None)
+
+    def sweep(self):
+        now = time.time()
+        with self.lock:
+            expired = [token for token, session in self.sessions.items() if session["expires_at"] <= now]
+            for token in expired:
+                del self.sessions[token]
+        return len(expired)
+
+class MongoSessionStore:
+    """Sessions shared by every auth worker and kept across restarts"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        # Mongo's TTL monitor removes expired sessions on its own schedule
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def get(self, token):
+        doc = self.collection.find_one({"_id": token, "expires_at": {"$gt": datetime.utcnow()}})
+        if not doc:
+            return None
+        return {
+            "email": doc["email"],
+            "name": doc["name"],
+            "expires_at": (doc["expires_at"] - EPOCH).total_seconds()
+        }
+
+    def put(self, token, session):
+        self.collection.insert_one({
+            "_id": token,
+            "email": session["email"],
+            "name": session["name"],
+            "expires_at": datetime.utcfromtimestamp(session["expires_at"])
+        })
+
+    def delete(self, token):
+        self.collection.delete_one({"_id": token})
+
+    def sweep(self):
+        return self.collection.delete_many({"expires_at": {"$lte": datetime.utcnow()}}).deleted_count
+
+class CachedSessionStore:
+    """Bounded read-through LRU in front of a session store.
+
+    Logouts on another worker can stay visible here for up to SESSION_CACHE_TTL.
+    """
+
+    def __init__(self, store, max_size, ttl):
+        self.store = store
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, token):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is not None:
+                session, cached_until = entry
+                if cached_until > now and session["expires_at"] > now:
+                    self.entries.move_to_end(token)
+                    return session
+                del self.entries[token]
+        
+        session = self.store.get(token)
+        if session is not None:
+            self.remember(token, session)
+        return session
+
+    def put(self, token, session):
+        self.store.put(token, session)
+        self.remember(token, session)
+
+    def delete(self, token):
+        with self.lock:
+            self.entries.pop(token, None)
+        self.store.delete(token)
+
+    def sweep(self):
+        return self.store.sweep()
+
+    def remember(self, token, session):
+        with self.lock:
+            self.entries[token] = (session, time.time() + self.ttl)
+            self.entries.move_to_end(token)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+def create_session_store():
+    store = MemorySessionStore() if SESSION_BACKEND == 'memory' else MongoSessionStore(db['sessions'])
+    return CachedSessionStore(store, SESSION_CACHE_SIZE, SESSION_CACHE_TTL)
+
+def run_session_sweeper(store):
+    while True:
+        time.sleep(SESSION_SWEEP_INTERVAL)
+        try:
+            store.sweep()
+        except Exception as e:
+            print(f"Error sweeping sessions: {e}")
+
+session_store = None
+if AUTH_TOKEN_MODE == 'session':
+    session_store = create_session_store()
+    threading.Thread(target=run_session_sweeper, args=(session_store,), daemon=True).start()
+
+def issue_session_token(user):
+    token = secrets.token_urlsafe(32)
+    session_store.put(token, {
+        "email": user["email"],
+        "name": user["name"],
+        "expires_at": time.time() + SESSION_TTL
+    })
+    return token
+
+# ==========================================
+# TOKENS (mode-independent)
+# ==========================================
+def issue_token(user):
+    if AUTH_TOKEN_MODE == 'session':
+        return issue_session_token(user)
+    return issue_signed_token(user)
+
+def decode_token(token):
+    """Return {"email", "name", ...} for a valid token, otherwise None"""
+    if AUTH_TOKEN_MODE == 'session':
+        return session_store.get(token)
+    return decode_signed_token(token)
+
+def revoke_token(token, claims):
+    if AUTH_TOKEN_MODE == 'session':
+        session_store.delete(token)
+    else:
+        revocation_list.revoke(claims["jti"], claims["exp"])
+
+# ==========================================
+# PASSWORD HASHING
+# ==========================================
+# PBKDF2 runs on worker processes; raising the work factor rehashes users on their next login
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', '600000'))
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 1)))
+# Hashes queued or running before new ones are rejected with 503
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', str(PASSWORD_HASH_WORKERS * 8)))
+
+password_hasher = PasswordHasher(PASSWORD_HASH_ITERATIONS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+def busy_response():
+    response = jsonify({"error": "Server busy, try again shortly"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 # Health check endpoint
 @app.route('/health', methods=['GET'])
@@ -31,18 +415,26 @@ def register():
     # Check if all fields are provided
     if not email or not password or not name:
         return jsonify({"error": "Missing fields"}), 400
-    
-    # Check if user exists in MongoDB
-    if users_collection.find_one({"email": email}):
+    if not isinstance(password, str):
+        return jsonify({"error": "Password must be a string"}), 400
+    if not EMAIL_INDEX_READY and users_collection.find_one({"email": email}, {"_id": 1}):
         return jsonify({"error": "User already exists"}), 400
     
+    try:
+        password_hash = password_hasher.hash(password)
+    except PoolSaturated:
+        return busy_response()
+    
     # Save new user to MongoDB
     user_data = {
         "name": name,
         "email": email,
-        "password": password  # In production, hash this!
+        "password": password_hash
     }
-    users_collection.insert_one(user_data)
+    try:
+        users_collection.insert_one(user_data)
+    except DuplicateKeyError:
+        return jsonify({"error": "User already exists"}), 400
     
     return jsonify({"message": "User registered successfully"}), 201
 
@@ -57,6 +449,10 @@ def login():
     if not email or not password:
         return jsonify({"error": "Missing email or password"}), 400
     
+    # Only strings can ever match a stored password
+    if not isinstance(password, str):
+        return jsonify({"error": "Invalid email or password"}), 401
+    
     # Find user in MongoDB
     user = users_collection.find_one({"email": email})
     
@@ -64,12 +460,24 @@ def login():
         return jsonify({"error": "Invalid email or password"}), 401
     
     # Check password
-    if user["password"] != password:
-        return jsonify({"error": "Invalid email or password"}), 401
+    try:
+        if not password_hasher.verify(password, user["password"]):
+            return jsonify({"error": "Invalid email or password"}), 401
+    except PoolSaturated:
+        return busy_response()
+    
+    # Upgrade plaintext passwords and hashes made with an older work factor
+    if password_hasher.needs_rehash(user["password"]):
+        try:
+            users_collection.update_one(
+                {"_id": user["_id"], "password": user["password"]},
+                {"$set": {"password": password_hasher.hash(password)}}
+            )
+        except PoolSaturated:
+            pass  # Retried on a later login
     
-    # Create simple token
-    token = f"token_{email}"
-    logged_in_users[token] = email
+    # Create a signed token (or a stored session in session mode)
+    token = issue_token(user)
     
     return jsonify({
         "message": "Login successful",
@@ -89,18 +497,13 @@ def verify():
     token = token.replace("Bearer ", "")
     
     # Check if token is valid
-    if token not in logged_in_users:
+    claims = decode_token(token)
+    if not claims:
         return jsonify({"error": "Invalid token"}), 401
     
-    email = logged_in_users[token]
-    user = users_collection.find_one({"email": email})
-    
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-    
     return jsonify({
         "valid": True,
-        "user": {"name": user["name"], "email": user["email"]}
+        "user": {"name": claims["name"], "email": claims["email"]}
     }), 200
 
 # Get current user info
@@ -116,25 +519,189 @@ def get_me():
     token = token.replace("Bearer ", "")
     
     # Check if token is valid
-    if token not in logged_in_users:
+    claims = decode_token(token)
+    if not claims:
         return jsonify({"error": "Invalid token"}), 401
     
-    email = logged_in_users[token]
-    user = users_collection.find_one({"email": email})
-    
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-    
     return jsonify({
-        "name": user["name"],
-        "email": user["email"]
+        "name": claims["name"],
+        "email": claims["email"]
     }), 200
 
-# Get all users (for testing and viewing in browser)
+# ==========================================
+# USER LISTING
+# ==========================================
+USERS_PAGE_SIZE = int(os.getenv('USERS_PAGE_SIZE', '100'))
+USERS_MAX_PAGE_SIZE = int(os.getenv('USERS_MAX_PAGE_SIZE', '1000'))
+# Fields that may be listed; the password hash never leaves the service
+USER_FIELDS = ("name", "email")
+
+# Cursors are the last _id of a page, base64url-encoded so clients treat them as opaque
+def encode_cursor(object_id):
+    return base64.urlsafe_b64encode(object_id.binary).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError, InvalidId):
+        return None
+
+def ndjson_users(users):
+    for user in users:
+        user.pop("_id")
+        yield json.dumps(user) + "\n"
+
+# List users a page at a time: ?limit=&cursor=&fields=name,email&format=ndjson
 @app.route('/api/auth/users', methods=['GET'])
 def get_all_users():
-    users = list(users_collection.find({}, {"_id": 0, "password": 0}))
-    return jsonify({"users": users}), 200
+    fields = [field for field in request.args.get('fields', ",".join(USER_FIELDS)).split(",") if field]
+    unknown = [field for field in fields if field not in USER_FIELDS]
+    if unknown or not fields:
+        return jsonify({"error": f"fields must be a subset of {', '.join(USER_FIELDS)}"}), 400
+    
+    query = {}
+    cursor = request.args.get('cursor')
+    if cursor:
+        after = decode_cursor(cursor)
+        if after is None:
+            return jsonify({"error": "Invalid cursor"}), 400
+        query["_id"] = {"$gt": after}
+    
+    try:
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    
+    # Keyset pagination: walking the _id index stays cheap however deep the page is
+    users = users_collection.find(query, {field: 1 for field in fields}).sort("_id", 1)
+    
+    # Streaming mode writes users as the cursor yields them, so memory stays flat
+    if request.args.get('format') == 'ndjson':
+        if limit:
+            users = users.limit(limit)
+        users = users.batch_size(USERS_PAGE_SIZE)
+        return Response(stream_with_context(ndjson_users(users)), mimetype='application/x-ndjson')
+    
+    limit = max(1, min(limit or USERS_PAGE_SIZE, USERS_MAX_PAGE_SIZE))
+    # One extra document tells us whether there is a next page
+    page = list(users.limit(limit + 1))
+    next_cursor = encode_cursor(page[limit - 1]["_id"]) if len(page) > limit else None
+    
+    page = page[:limit]
+    for user in page:
+        user.pop("_id")
+    
+    return jsonify({"users": page, "next": next_cursor}), 200
+
+# ==========================================
+# BULK IMPORT
+# ==========================================
+# NDJSON in ({"name", "email", "password"} per line), one NDJSON result per line out
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+DUPLICATE_KEY = 11000
+
+def parse_import_line(line, raw):
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return None, {"line": line, "status": "error", "error": "Invalid JSON"}
+    
+    if not isinstance(data, dict) or not all(data.get(field) for field in ("name", "email", "password")):
+        return None, {"line": line, "email": data.get("email") if isinstance(data, dict) else None,
+                      "status": "error", "error": "Missing fields"}
+    if not all(isinstance(data[field], str) for field in ("name", "email", "password")):
+        return None, {"line": line, "email": data["email"], "status": "error",
+                      "error": "name, email and password must be strings"}
+    
+    return {"line": line, "name": data["name"], "email": data["email"], "password": data["password"]}, None
+
+def split_existing_emails(rows):
+    """Rows whose email is not stored yet, and the rest; only needed without the unique index"""
+    emails = [row["email"] for row in rows]
+    seen = {user["email"] for user in users_collection.find({"email": {"$in": emails}}, {"email": 1})}
+    fresh, duplicates = [], []
+    for row in rows:
+        (duplicates if row["email"] in seen else fresh).append(row)
+        seen.add(row["email"])
+    return fresh, duplicates
+
+def import_batch(rows):
+    """Insert a batch with one unordered insert_many and yield a result per row"""
+    if not EMAIL_INDEX_READY:
+        try:
+            rows, duplicates = split_existing_emails(rows)
+        except Exception as e:
+            for row in rows:
+                yield {"line": row["line"], "email": row["email"], "status": "error", "error": f"Could not check existing emails: {e}"}
+            return
+        for row in duplicates:
+            yield {"line": row["line"], "email": row["email"], "status": "error", "error": "User already exists"}
+        if not rows:
+            return
+    
+    # A failure here is reported against every row of the batch, so the import carries on
+    try:
+        hashes = password_hasher.hash_many([row["password"] for row in rows])
+    except Exception as e:
+        for row in rows:
+            yield {"line": row["line"], "email": row["email"], "status": "error", "error": f"Could not hash password: {e}"}
+        return
+    
+    documents = [
+        {"name": row["name"], "email": row["email"], "password": password_hash}
+        for row, password_hash in zip(rows, hashes)
+    ]
+    
+    # Unordered, so one bad row doesn't stop the rest of the batch
+    errors = {}
+    try:
+        users_collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        errors = {error["index"]: error for error in e.details["writeErrors"]}
+    except Exception as e:
+        for row in rows:
+            yield {"line": row["line"], "email": row["email"], "status": "error", "error": f"Insert failed: {e}"}
+        return
+    
+    for index, row in enumerate(rows):
+        result = {"line": row["line"], "email": row["email"], "status": "created"}
+        error = errors.get(index)
+        if error:
+            result["status"] = "error"
+            result["error"] = "User already exists" if error["code"] == DUPLICATE_KEY else error["errmsg"]
+        yield result
+
+def import_results(lines):
+    counts = {"created": 0, "error": 0}
+    batch = []
+    
+    def record(result):
+        counts[result["status"]] += 1
+        return json.dumps(result) + "\n"
+    
+    for line, raw in enumerate(lines, start=1):
+        if not raw.strip():
+            continue
+        row, error = parse_import_line(line, raw)
+        if error:
+            yield record(error)
+            continue
+        batch.append(row)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            for result in import_batch(batch):
+                yield record(result)
+            batch = []
+    
+    if batch:
+        for result in import_batch(batch):
+            yield record(result)
+    
+    yield json.dumps({"summary": counts}) + "\n"
+
+# Bulk import users; rows are read and inserted as they arrive
+@app.route('/api/auth/users/import', methods=['POST'])
+def import_users():
+    return Response(stream_with_context(import_results(request.stream)), mimetype='application/x-ndjson')
 
 # Logout
 @app.route('/api/auth/logout', methods=['POST'])
@@ -143,10 +710,13 @@ def logout():
     
     if token:
         token = token.replace("Bearer ", "")
-        if token in logged_in_users:
-            del logged_in_users[token]
+        claims = decode_token(token)
+        if claims:
+            revoke_token(token, claims)
     
     return jsonify({"message": "Logged out successfully"}), 200
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=84, debug=True)
\ No newline at end of file
+    # serve.py is the entry point: pool workers re-import __main__, which must not be this module
+    serve_entry = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py')
+    os.execv(sys.executable, [sys.executable, serve_entry])
\ No newline at end of file
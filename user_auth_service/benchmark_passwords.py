@@ -0,0 +1,40 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from passwords import hash_password, verify_password
+
+# Measures password verification throughput (logins/sec) at the configured work factor.
+# Usage: python benchmark_passwords.py --iterations 600000 --logins 200
+
+PASSWORD = "correct horse battery staple"
+
+def run(workers, logins, encoded):
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Warm up so process start-up is not measured
+        list(pool.map(verify_password, [PASSWORD] * workers, [encoded] * workers))
+        started = time.perf_counter()
+        results = list(pool.map(verify_password, [PASSWORD] * logins, [encoded] * logins))
+        elapsed = time.perf_counter() - started
+    assert all(results)
+    return logins / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Password verification throughput")
+    parser.add_argument("--iterations", type=int, default=int(os.getenv("PASSWORD_HASH_ITERATIONS", "600000")))
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="*", default=None)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1, max(1, cores // 2), cores})
+    encoded = hash_password(PASSWORD, args.iterations)
+
+    print(f"pbkdf2_sha256, {args.iterations} iterations, {args.logins} logins, {cores} cores")
+    for workers in worker_counts:
+        rate = run(workers, args.logins, encoded)
+        print(f"{workers:>3} workers  {rate:9.1f} logins/s  {rate / workers:9.1f} logins/s per core")
+
+if __name__ == "__main__":
+    main()
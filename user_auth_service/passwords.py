@@ -0,0 +1,100 @@
+import base64
+import hashlib
+import hmac
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Password hashing, kept free of Flask/Mongo imports so pool workers and the
+# benchmark can load it cheaply.
+
+ALGORITHM = "pbkdf2_sha256"
+
+def b64encode(data):
+    return base64.b64encode(data).decode("ascii")
+
+def hash_password(password, iterations):
+    """Return "pbkdf2_sha256$<iterations>$<salt>$<digest>" for a new random salt"""
+    salt = os.urandom(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"{ALGORITHM}${iterations}${b64encode(salt)}${b64encode(digest)}"
+
+def verify_password(password, encoded):
+    """Check a password against a stored value; plaintext values from before hashing still verify.
+
+    Stored values that can't be parsed never match.
+    """
+    if not isinstance(encoded, str):
+        return False
+    if not encoded.startswith(ALGORITHM + "$"):
+        return hmac.compare_digest(password.encode("utf-8"), encoded.encode("utf-8"))
+
+    try:
+        _, iterations, salt, digest = encoded.split("$")
+        candidate = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), base64.b64decode(salt), int(iterations))
+        return hmac.compare_digest(candidate, base64.b64decode(digest))
+    except ValueError:
+        # Wrong number of fields, bad base64 or a non-numeric/zero iteration count
+        return False
+
+def hash_passwords(passwords, iterations):
+    return [hash_password(password, iterations) for password in passwords]
+
+def needs_rehash(encoded, iterations):
+    # Plaintext values and hashes made with a different work factor are upgraded on login
+    return not encoded.startswith(f"{ALGORITHM}${iterations}$")
+
+class PoolSaturated(Exception):
+    """Raised when the hashing queue is full and the request should be rejected"""
+
+class PasswordHasher:
+    """Runs hashing on a process pool so it never holds the GIL on request threads"""
+
+    def __init__(self, iterations, workers, max_pending):
+        self.iterations = iterations
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def executor(self):
+        # Created on first use. Workers come from a forkserver rather than a fork of the
+        # service, whose Mongo and background threads may hold locks at fork time; only
+        # this module is preloaded there, not the service's __main__.
+        with self.lock:
+            if self.pool is None:
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload([__name__])
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self.pool
+
+    def submit(self, fn, *args, wait=False):
+        # Interactive callers are rejected when the queue is full; bulk callers wait for a slot
+        if not self.slots.acquire(blocking=wait):
+            raise PoolSaturated()
+        try:
+            future = self.executor().submit(fn, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def hash(self, password):
+        return self.submit(hash_password, password, self.iterations).result()
+
+    def verify(self, password, encoded):
+        return self.submit(verify_password, password, encoded).result()
+
+    def hash_many(self, passwords):
+        """Hash a batch as one chunk per worker, waiting for queue slots instead of failing"""
+        size = -(-len(passwords) // self.workers) or 1
+        futures = [
+            self.submit(hash_passwords, passwords[start:start + size], self.iterations, wait=True)
+            for start in range(0, len(passwords), size)
+        ]
+        return [encoded for future in futures for encoded in future.result()]
+
+    def needs_rehash(self, encoded):
+        return needs_rehash(encoded, self.iterations)
@@ -0,0 +1,6 @@
+# Entry point for the auth service. The password pool starts its workers from a
+# forkserver, and every worker re-imports __main__; keeping the service itself in
+# app.py means that import is this file, not a second copy of the whole service.
+if __name__ == '__main__':
+    from app import app
+    app.run(host='0.0.0.0', port=84, debug=True)
@@ -1,27 +1,268 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g
 from flask_cors import CORS
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
+from pymongo.monitoring import CommandListener
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 import random
 import os
-from datetime import datetime
+import sys
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as Date, datetime, timedelta
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin
 
 app = Flask(__name__)
 CORS(app)
 
+# ==========================================
+# METRICS & ACCESS LOG
+# ==========================================
+REQUEST_COUNT = Counter("http_requests_total", "HTTP requests handled", ["route", "method", "status"])
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency", ["route", "method"])
+MONGO_LATENCY = Histogram("mongo_command_duration_seconds", "MongoDB command latency", ["command", "outcome"])
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Latency of calls to other services",
+    ["upstream", "method", "outcome"]
+)
+
+ACCESS_LOG_BATCH_SIZE = int(os.getenv("ACCESS_LOG_BATCH_SIZE", "256"))
+ACCESS_LOG_QUEUE_SIZE = int(os.getenv("ACCESS_LOG_QUEUE_SIZE", "10000"))
+
+class AccessLog:
+    """JSON-lines access log, written in batches by a background thread"""
+
+    def __init__(self, service, stream=sys.stdout):
+        self.service = service
+        self.stream = stream
+        self.entries = queue.Queue(maxsize=ACCESS_LOG_QUEUE_SIZE)
+        self.dropped = 0
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def log(self, **fields):
+        fields["ts"] = datetime.utcnow().isoformat()
+        fields["service"] = self.service
+        try:
+            self.entries.put_nowait(fields)
+        except queue.Full:
+            # Never block a request on logging
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            batch = [self.entries.get()]
+            while len(batch) < ACCESS_LOG_BATCH_SIZE:
+                try:
+                    batch.append(self.entries.get_nowait())
+                except queue.Empty:
+                    break
+            self.stream.write("".join(json.dumps(entry) + "\n" for entry in batch))
+            self.stream.flush()
+
+access_log = AccessLog("weather_service")
+
+class MongoCommandTimer(CommandListener):
+    """Times every MongoDB command issued by this service"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_LATENCY.labels(event.command_name, "ok").observe(event.duration_micros / 1e6)
+
+    def failed(self, event):
+        MONGO_LATENCY.labels(event.command_name, "error").observe(event.duration_micros / 1e6)
+
+@app.before_request
+def start_timer():
+    g.start_time = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    duration = time.perf_counter() - g.get("start_time", time.perf_counter())
+    REQUEST_COUNT.labels(route, request.method, response.status_code).inc()
+    REQUEST_LATENCY.labels(route, request.method).observe(duration)
+    access_log.log(
+        method=request.method,
+        path=request.path,
+        route=route,
+        status=response.status_code,
+        duration_ms=round(duration * 1000, 2)
+    )
+    return response
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(generate_latest(), content_type=CONTENT_TYPE_LATEST)
+
 # MongoDB Configuration
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://weather-mongodb:27017/")
-client = MongoClient(MONGO_URI)
+client = MongoClient(MONGO_URI, event_listeners=[MongoCommandTimer()])
 db = client["weather_service"]
 forecasts_collection = db["forecasts"]
 bookings_collection = db["bookings"]
 
+# At most one confirmed booking per room and date; cancelled bookings fall outside the index.
+# If it can't be built (a room is already double-booked), confirms check for a booking first
+# instead, which still stops sequential double bookings though not perfectly concurrent ones.
+try:
+    bookings_collection.create_index(
+        [("room_id", 1), ("date", 1)],
+        unique=True,
+        partialFilterExpression={"status": "confirmed"},
+        name="one_confirmed_booking_per_room_date"
+    )
+    BOOKING_INDEX_READY = True
+except OperationFailure as e:
+    BOOKING_INDEX_READY = False
+    print(f"Could not create booking uniqueness index (room already double-booked?), "
+          f"falling back to checking for a booking before confirming: {e}")
+
+# ==========================================
+# OCCUPANCY INDEX
+# ==========================================
+# Confirmed bookings as one bitmap per room per month (bit d-1 set = day d booked), so a
+# date-range calendar is answered from memory. Updated on confirm/cancel and rebuilt
+# from bookings at startup and every OCCUPANCY_REBUILD_INTERVAL seconds
+OCCUPANCY_REBUILD_INTERVAL = float(os.getenv("OCCUPANCY_REBUILD_INTERVAL", "300"))
+
+def parse_date(value):
+    try:
+        return Date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+class OccupancyIndex:
+    """{room_id: {(year, month): bitmap}} of confirmed bookings"""
+
+    def __init__(self):
+        self.rooms = defaultdict(dict)
+        self.lock = threading.Lock()
+        # Marks made while a rebuild is scanning, replayed onto the new index before it is swapped in
+        self.pending = None
+
+    @staticmethod
+    def apply(rooms, room_id, key, bit, booked):
+        months = rooms[room_id]
+        bits = months.get(key, 0)
+        bits = bits | bit if booked else bits & ~bit
+        if bits:
+            months[key] = bits
+        else:
+            months.pop(key, None)
+
+    def mark(self, room_id, date, booked):
+        day = parse_date(date)
+        if day is None:
+            return
+        key = (day.year, day.month)
+        bit = 1 << (day.day - 1)
+        with self.lock:
+            self.apply(self.rooms, room_id, key, bit, booked)
+            if self.pending is not None:
+                self.pending.append((room_id, key, bit, booked))
+
+    def booked_days(self, room_id, start, end):
+        with self.lock:
+            months = dict(self.rooms.get(room_id, {}))
+        
+        booked = []
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            bits = months.get((year, month), 0)
+            while bits:
+                lowest = bits & -bits
+                day = Date(year, month, lowest.bit_length())
+                if start <= day <= end:
+                    booked.append(day)
+                bits ^= lowest
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return booked
+
+    def rebuild(self, collection):
+        with self.lock:
+            self.pending = []
+        try:
+            rooms = defaultdict(dict)
+            for booking in collection.find({"status": "confirmed"}, {"_id": 0, "room_id": 1, "date": 1}):
+                day = parse_date(booking.get("date"))
+                if day is not None:
+                    key = (day.year, day.month)
+                    months = rooms[booking["room_id"]]
+                    months[key] = months.get(key, 0) | (1 << (day.day - 1))
+            with self.lock:
+                # The scan may have missed a booking or cancellation that raced it; the
+                # marks are already committed, so applying them in order is always correct
+                for room_id, key, bit, booked in self.pending:
+                    self.apply(rooms, room_id, key, bit, booked)
+                self.rooms = rooms
+        finally:
+            with self.lock:
+                self.pending = None
+
+    def run(self, collection):
+        while True:
+            time.sleep(OCCUPANCY_REBUILD_INTERVAL)
+            try:
+                self.rebuild(collection)
+            except Exception as e:
+                print(f"Error rebuilding occupancy index: {e}")
+
+    def stats(self):
+        with self.lock:
+            return {"rooms": len(self.rooms), "months": sum(len(months) for months in self.rooms.values())}
+
+occupancy = OccupancyIndex()
+try:
+    occupancy.rebuild(bookings_collection)
+except Exception as e:
+    print(f"Error building occupancy index: {e}")
+threading.Thread(target=occupancy.run, args=(bookings_collection,), daemon=True).start()
+
 # Room Service Configuration
 ROOM_SERVICE_URL = os.getenv("ROOM_SERVICE_URL", "http://room-service:85")
 
 BASE_TEMP = 21  # degrees C
 
+def forecast_pricing(forecast, location, date, base_price, room_id, room_name):
+    """Price a room from a stored forecast's temperature"""
+    temp_diff = forecast.get("temperature_difference", 0)
+    surcharge_percentage = calculate_surcharge(temp_diff)
+    additional_charge = (surcharge_percentage / 100) * base_price
+    final_price = base_price + additional_charge
+
+    return {
+        "location": location,
+        "date": date,
+        "forecasted_temperature": forecast["forecasted_temperature"],
+        "temperature_difference": temp_diff,
+        "additional_charge_percentage": surcharge_percentage,
+        "additional_charge_amount": round(additional_charge, 2),
+        "final_price": round(final_price, 2),
+        "base_price": base_price,
+        "room_id": room_id,
+        "room_name": room_name
+    }
+
+# Availability answers are public, so they only say that a booking exists, never who made it
+BOOKING_SUMMARY_FIELDS = ("_id", "status", "booked_at")
+BOOKING_SUMMARY_PROJECTION = {field: 1 for field in BOOKING_SUMMARY_FIELDS}
+
+def public_booking(booking):
+    if not booking:
+        return None
+    summary = {field: booking[field] for field in BOOKING_SUMMARY_FIELDS if field in booking}
+    summary["_id"] = str(summary["_id"])
+    return summary
+
 def calculate_surcharge(temp_diff):
     """Calculate surcharge percentage based on temperature difference from base temp"""
     if temp_diff < 2:
@@ -35,23 +276,137 @@ def calculate_surcharge(temp_diff):
     else:
         return 50
 
+# ==========================================
+# ROOM CACHE
+# ==========================================
+# Room price, name and location change rarely, so lookups are cached: fresh entries are
+# served as-is, stale ones are served while a background refresh fetches the new value
+ROOM_CACHE_SIZE = int(os.getenv("ROOM_CACHE_SIZE", "1024"))
+ROOM_CACHE_TTL = float(os.getenv("ROOM_CACHE_TTL", "60"))
+ROOM_CACHE_STALE_TTL = float(os.getenv("ROOM_CACHE_STALE_TTL", "600"))
+ROOM_SERVICE_TIMEOUT = float(os.getenv("ROOM_SERVICE_TIMEOUT", "5"))
+ROOM_SERVICE_POOL_SIZE = int(os.getenv("ROOM_SERVICE_POOL_SIZE", "20"))
+
+room_session = requests.Session()
+room_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=ROOM_SERVICE_POOL_SIZE))
+room_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=ROOM_SERVICE_POOL_SIZE))
+
+def fetch_room(room_id):
+    """(price_per_day, name, location) from room service, None if the room doesn't exist"""
+    started = time.perf_counter()
+    try:
+        response = room_session.get(urljoin(ROOM_SERVICE_URL, f"/api/rooms/{room_id}"), timeout=ROOM_SERVICE_TIMEOUT)
+    except requests.exceptions.RequestException:
+        UPSTREAM_LATENCY.labels("room", "GET", "error").observe(time.perf_counter() - started)
+        raise
+    UPSTREAM_LATENCY.labels("room", "GET", "ok" if response.status_code < 500 else "failure").observe(time.perf_counter() - started)
+    
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    room_data = response.json()
+    return room_data.get("price_per_day", 0), room_data.get("name", "Unknown"), room_data.get("location", "Unknown")
+
+class RoomCache:
+    """LRU of room lookups with a freshness TTL and stale-while-revalidate"""
+
+    def __init__(self, fetch, max_size, ttl, stale_ttl):
+        self.fetch = fetch
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.entries = OrderedDict()
+        self.refreshing = set()
+        self.refresher = ThreadPoolExecutor(max_workers=4)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, room_id):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(room_id)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age < self.ttl:
+                    self.entries.move_to_end(room_id)
+                    self.hits += 1
+                    return value
+                if age < self.stale_ttl:
+                    self.entries.move_to_end(room_id)
+                    self.stale_hits += 1
+                    if room_id not in self.refreshing:
+                        self.refreshing.add(room_id)
+                        self.refresher.submit(self.revalidate, room_id)
+                    return value
+            self.misses += 1
+        
+        value = self.fetch(room_id)
+        self.store(room_id, value)
+        return value
+
+    def peek(self, room_id):
+        """Cached value that has not aged out, without fetching or revalidating; None on a miss"""
+        with self.lock:
+            entry = self.entries.get(room_id)
+            if entry is not None and time.monotonic() - entry[1] < self.stale_ttl:
+                return entry[0]
+            return None
+
+    def store(self, room_id, value):
+        with self.lock:
+            if value is None:
+                self.entries.pop(room_id, None)
+                return
+            self.entries[room_id] = (value, time.monotonic())
+            self.entries.move_to_end(room_id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def revalidate(self, room_id):
+        try:
+            self.store(room_id, self.fetch(room_id))
+        except Exception as e:
+            # Keep serving the stale value until it ages out
+            print(f"Error refreshing room {room_id}: {e}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(room_id)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else None
+            }
+
+room_cache = RoomCache(fetch_room, ROOM_CACHE_SIZE, ROOM_CACHE_TTL, ROOM_CACHE_STALE_TTL)
+
 def get_room_price(room_id):
-    """Fetch room price from room service"""
+    """Fetch room price from room service (cached)"""
     try:
-        room_service_url = urljoin(ROOM_SERVICE_URL, f"/api/rooms/{room_id}")
-        response = requests.get(room_service_url, timeout=5)
-        if response.status_code == 200:
-            room_data = response.json()
-            return room_data.get("price_per_day", 0), room_data.get("name", "Unknown"), room_data.get("location", "Unknown")
-        else:
-            return None, None, None
+        room = room_cache.get(room_id)
     except Exception as e:
         print(f"Error fetching room price: {e}")
         return None, None, None
+    if room is None:
+        return None, None, None
+    return room
 
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"message": "Weather & Booking service running on port 86"}), 200
+    return jsonify({
+        "message": "Weather & Booking service running on port 86",
+        "room_cache": room_cache.stats(),
+        "occupancy": occupancy.stats()
+    }), 200
 
 # Fetch weather forecast + calculate final price based on room service price
 @app.route("/api/weather/forecast", methods=["POST"])
@@ -147,43 +502,120 @@ def check_availability():
         "room_id": room_id,
         "date": date,
         "status": "confirmed"
-    })
+    }, BOOKING_SUMMARY_PROJECTION)
 
     available = existing_booking is None
 
     # Get or generate forecast with weather-adjusted pricing
-    forecast_resp = forecasts_collection.find_one({"location": location, "date": date})
-    if forecast_resp:
-        # Recalculate pricing with current room price
-        temp_diff = forecast_resp.get("temperature_difference", 0)
-        surcharge_percentage = calculate_surcharge(temp_diff)
-        additional_charge = (surcharge_percentage / 100) * base_price
-        final_price = base_price + additional_charge
-
-        forecast_resp = {
-            "location": location,
-            "date": date,
-            "forecasted_temperature": forecast_resp["forecasted_temperature"],
-            "temperature_difference": temp_diff,
-            "additional_charge_percentage": surcharge_percentage,
-            "additional_charge_amount": round(additional_charge, 2),
-            "final_price": round(final_price, 2),
-            "base_price": base_price,
-            "room_id": room_id,
-            "room_name": room_name
-        }
-    else:
+    forecast = forecasts_collection.find_one({"location": location, "date": date})
+    if not forecast:
         # Generate new forecast
-        forecast_resp = get_weather_forecast_data(location, date, base_price, room_id, room_name)
+        forecast = get_weather_forecast_data(location, date, base_price, room_id, room_name)
+    # Priced the same way as the bulk endpoint, so stored forecast fields never leak through
+    forecast_resp = forecast_pricing(forecast, location, date, base_price, room_id, room_name)
 
     return jsonify({
         "available": available,
         "room_id": room_id,
         "room_name": room_name,
         "pricing": forecast_resp,
-        "existing_booking": existing_booking if existing_booking else None
+        "existing_booking": public_booking(existing_booking)
     }), 200
 
+# ==========================================
+# BULK AVAILABILITY
+# ==========================================
+BULK_AVAILABILITY_MAX = int(os.getenv("BULK_AVAILABILITY_MAX", "500"))
+
+def fetch_rooms(room_ids):
+    """{room_id: (price_per_day, name, location)} in one room service call; None means every room"""
+    method = "GET" if room_ids is None else "POST"
+    started = time.perf_counter()
+    try:
+        if room_ids is None:
+            response = room_session.get(urljoin(ROOM_SERVICE_URL, "/api/rooms"), timeout=ROOM_SERVICE_TIMEOUT)
+        else:
+            response = room_session.post(
+                urljoin(ROOM_SERVICE_URL, "/api/rooms/batch"),
+                json={"ids": room_ids, "fields": ["name", "location", "price_per_day"]},
+                timeout=ROOM_SERVICE_TIMEOUT
+            )
+    except requests.exceptions.RequestException:
+        UPSTREAM_LATENCY.labels("room", method, "error").observe(time.perf_counter() - started)
+        raise
+    UPSTREAM_LATENCY.labels("room", method, "ok" if response.status_code < 500 else "failure").observe(time.perf_counter() - started)
+    response.raise_for_status()
+
+    rooms = {
+        room["room_id"]: (room.get("price_per_day", 0), room.get("name", "Unknown"), room.get("location", "Unknown"))
+        for room in response.json()["rooms"]
+    }
+    # Single-room lookups benefit from what the batch just fetched
+    for room_id, room in rooms.items():
+        room_cache.store(room_id, room)
+    return rooms
+
+# Availability and pricing for many rooms on one date: {"date": ..., "rooms": [...] or "all"}
+@app.route("/api/booking/availability/bulk", methods=["POST"])
+def bulk_availability():
+    """Same per-room result as check-availability, from one booking query and one forecast query"""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    date = data.get("date")
+    room_ids = data.get("rooms")
+
+    if not date:
+        return jsonify({"error": "date is required"}), 400
+    if room_ids == "all":
+        room_ids = None
+    elif not isinstance(room_ids, list) or not room_ids or not all(isinstance(room_id, str) for room_id in room_ids):
+        return jsonify({"error": "rooms must be a list of room IDs or \"all\""}), 400
+    elif len(room_ids) > BULK_AVAILABILITY_MAX:
+        return jsonify({"error": f"At most {BULK_AVAILABILITY_MAX} rooms per request"}), 400
+    else:
+        room_ids = list(dict.fromkeys(room_ids))
+
+    try:
+        rooms = fetch_rooms(room_ids)
+    except Exception as e:
+        print(f"Error fetching rooms: {e}")
+        return jsonify({"error": "Room service unavailable"}), 503
+
+    ordered_ids = list(rooms) if room_ids is None else [room_id for room_id in room_ids if room_id in rooms]
+    missing = [] if room_ids is None else [room_id for room_id in room_ids if room_id not in rooms]
+
+    bookings = {
+        booking["room_id"]: public_booking(booking)
+        for booking in bookings_collection.find({
+            "room_id": {"$in": ordered_ids},
+            "date": date,
+            "status": "confirmed"
+        }, {**BOOKING_SUMMARY_PROJECTION, "room_id": 1})
+    }
+
+    locations = list(dict.fromkeys(rooms[room_id][2] for room_id in ordered_ids))
+    forecasts = {
+        forecast["location"]: forecast
+        for forecast in forecasts_collection.find({"location": {"$in": locations}, "date": date})
+    }
+
+    results = []
+    for room_id in ordered_ids:
+        base_price, room_name, location = rooms[room_id]
+        if location not in forecasts:
+            # First room seen at a location without a forecast generates it for the rest
+            forecasts[location] = get_weather_forecast_data(location, date, base_price, room_id, room_name)
+        results.append({
+            "available": room_id not in bookings,
+            "room_id": room_id,
+            "room_name": room_name,
+            "pricing": forecast_pricing(forecasts[location], location, date, base_price, room_id, room_name),
+            "existing_booking": bookings.get(room_id)
+        })
+
+    return jsonify({"date": date, "rooms": results, "count": len(results), "missing": missing}), 200
+
 def get_weather_forecast_data(location, date, base_price, room_id="", room_name="Unknown"):
     """Generate weather forecast and calculate pricing"""
     forecast_temp = random.randint(-5, 35)
@@ -209,6 +641,14 @@ def get_weather_forecast_data(location, date, base_price, room_id="", room_name=
     forecast["_id"] = str(result.inserted_id)
     return forecast
 
+def booking_conflict(existing_booking):
+    return jsonify({
+        "success": False,
+        "message": "Room already booked for this date",
+        "booked_by": existing_booking.get("client_name"),
+        "booked_at": existing_booking.get("booked_at")
+    }), 409
+
 # Confirm booking - Mark room as booked
 @app.route("/api/booking/confirm", methods=["POST"])
 def confirm_booking():
@@ -227,19 +667,10 @@ def confirm_booking():
     if base_price is None:
         return jsonify({"error": f"Room {room_id} not found"}), 404
 
-    # Double-check: Ensure room is not already booked
-    existing_booking = bookings_collection.find_one({
-        "room_id": room_id,
-        "date": date,
-        "status": "confirmed"
-    })
-    if existing_booking:
-        return jsonify({
-            "success": False,
-            "message": "Room already booked for this date",
-            "booked_by": existing_booking.get("client_name"),
-            "booked_at": existing_booking.get("booked_at")
-        }), 409
+    if not BOOKING_INDEX_READY:
+        existing_booking = bookings_collection.find_one({"room_id": room_id, "date": date, "status": "confirmed"})
+        if existing_booking:
+            return booking_conflict(existing_booking)
 
     # Get or generate forecast
     forecast = forecasts_collection.find_one({"location": location, "date": date})
@@ -277,15 +708,24 @@ def confirm_booking():
         "booked_at": datetime.utcnow().isoformat()
     }
 
+    # The unique index decides between concurrent confirms in a single insert
     try:
         result = bookings_collection.insert_one(booking)
         booking["_id"] = str(result.inserted_id)
+        occupancy.mark(room_id, date, True)
 
         return jsonify({
             "success": True,
             "message": "Booking confirmed successfully",
             "booking": booking
         }), 201
+    except DuplicateKeyError:
+        existing_booking = bookings_collection.find_one({
+            "room_id": room_id,
+            "date": date,
+            "status": "confirmed"
+        }) or {}
+        return booking_conflict(existing_booking)
     except Exception as e:
         return jsonify({
             "success": False,
@@ -312,6 +752,50 @@ def get_room_bookings(room_id, date):
         "is_booked": len(bookings) > 0
     }), 200
 
+# Free and booked days per room over a date range:
+# /api/booking/calendar?rooms=LON002,MAN001&from=2025-03-01&to=2025-03-31
+CALENDAR_MAX_DAYS = int(os.getenv("CALENDAR_MAX_DAYS", "366"))
+CALENDAR_MAX_ROOMS = int(os.getenv("CALENDAR_MAX_ROOMS", "100"))
+
+@app.route("/api/booking/calendar", methods=["GET"])
+def availability_calendar():
+    """Availability calendar served from the occupancy index"""
+    room_ids = list(dict.fromkeys(room_id for room_id in request.args.get("rooms", "").split(",") if room_id))
+    start = parse_date(request.args.get("from"))
+    end = parse_date(request.args.get("to"))
+
+    if not room_ids:
+        return jsonify({"error": "rooms is required"}), 400
+    if len(room_ids) > CALENDAR_MAX_ROOMS:
+        return jsonify({"error": f"At most {CALENDAR_MAX_ROOMS} rooms per request"}), 400
+    if start is None or end is None:
+        return jsonify({"error": "from and to are required as YYYY-MM-DD"}), 400
+    if end < start or (end - start).days >= CALENDAR_MAX_DAYS:
+        return jsonify({"error": f"to must be on or after from, spanning at most {CALENDAR_MAX_DAYS} days"}), 400
+
+    # Unknown room IDs are reported under "missing" like the bulk endpoint, not as free every day
+    uncached = [room_id for room_id in room_ids if room_cache.peek(room_id) is None]
+    try:
+        found = fetch_rooms(uncached) if uncached else {}
+    except Exception as e:
+        print(f"Error fetching rooms: {e}")
+        return jsonify({"error": "Room service unavailable"}), 503
+    missing = [room_id for room_id in uncached if room_id not in found]
+
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    rooms = []
+    for room_id in room_ids:
+        if room_id in missing:
+            continue
+        booked = set(occupancy.booked_days(room_id, start, end))
+        rooms.append({
+            "room_id": room_id,
+            "booked": [day.isoformat() for day in days if day in booked],
+            "free": [day.isoformat() for day in days if day not in booked]
+        })
+
+    return jsonify({"from": start.isoformat(), "to": end.isoformat(), "rooms": rooms, "missing": missing}), 200
+
 # Cancel booking
 @app.route("/api/booking/cancel/<booking_id>", methods=["POST"])
 def cancel_booking(booking_id):
@@ -319,13 +803,17 @@ def cancel_booking(booking_id):
     from bson.objectid import ObjectId
     
     try:
-        result = bookings_collection.update_one(
+        previous = bookings_collection.find_one_and_update(
             {"_id": ObjectId(booking_id)},
-            {"$set": {"status": "cancelled", "cancelled_at": datetime.utcnow().isoformat()}}
+            {"$set": {"status": "cancelled", "cancelled_at": datetime.utcnow().isoformat()}},
+            projection={"room_id": 1, "date": 1, "status": 1},
+            return_document=ReturnDocument.BEFORE
         )
         
-        if result.matched_count == 0:
+        if previous is None:
             return jsonify({"error": "Booking not found"}), 404
+        if previous.get("status") == "confirmed":
+            occupancy.mark(previous["room_id"], previous["date"], False)
         
         return jsonify({
             "success": True,
@@ -0,0 +1,57 @@
+import argparse
+import random
+import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+import requests
+
+# Fires K simultaneous confirms for the same room and date at a running service and
+# checks that exactly one wins (201) while the rest are rejected (409).
+# Usage: python stress_confirm.py --url http://localhost:86 --room LON001 --parallel 50
+
+def confirm(url, room_id, date, index, barrier):
+    barrier.wait()
+    response = requests.post(f"{url}/api/booking/confirm", json={
+        "room_id": room_id,
+        "date": date,
+        "client_name": f"Stress Client {index}",
+        "client_email": f"stress{index}@example.com"
+    }, timeout=30)
+    return response.status_code, response.json()
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent booking confirmation stress test")
+    parser.add_argument("--url", default="http://localhost:86")
+    parser.add_argument("--room", default="LON001")
+    parser.add_argument("--parallel", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="Keep the winning bookings instead of cancelling them")
+    args = parser.parse_args()
+
+    failed = False
+    for round_number in range(1, args.rounds + 1):
+        # A random far-future date, so earlier runs and real bookings don't interfere
+        date = f"{random.randint(2100, 2999)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}"
+        barrier = Barrier(args.parallel)
+        with ThreadPoolExecutor(max_workers=args.parallel) as pool:
+            results = list(pool.map(
+                lambda index: confirm(args.url, args.room, date, index, barrier),
+                range(args.parallel)
+            ))
+
+        statuses = Counter(status for status, _ in results)
+        ok = statuses[201] == 1 and statuses[409] == args.parallel - 1
+        failed |= not ok
+        print(f"round {round_number}: {args.room} on {date}: {dict(statuses)} {'OK' if ok else 'FAIL'}")
+
+        if not args.keep:
+            for status, body in results:
+                if status == 201:
+                    requests.post(f"{args.url}/api/booking/cancel/{body['booking']['_id']}", timeout=30)
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
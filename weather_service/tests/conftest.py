@@ -0,0 +1,21 @@
+import os
+import sys
+from unittest import mock
+
+import mongomock
+import pytest
+
+# Tests import the service as a top-level module, the way it runs in its container
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def in_memory_client(*args, event_listeners=None, **kwargs):
+    return mongomock.MongoClient(*args, **kwargs)
+
+@pytest.fixture(scope="session")
+def service():
+    """The weather service module, backed by an in-memory mongomock database"""
+    with mock.patch("pymongo.MongoClient", in_memory_client):
+        import app
+    # Every room exists, so tests never call the room service
+    app.room_cache.fetch = lambda room_id: (200, f"Room {room_id}", "London, UK")
+    return app
@@ -0,0 +1,58 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier, Lock
+
+import pytest
+
+PARALLEL = 25
+
+@pytest.fixture
+def atomic_inserts(service, monkeypatch):
+    # MongoDB checks the unique index and inserts as one step; mongomock does not, so
+    # inserts are serialized here while the confirm requests themselves still race
+    collection = service.bookings_collection
+    insert_one = collection.insert_one
+    lock = Lock()
+
+    def insert_one_atomically(document, *args, **kwargs):
+        with lock:
+            return insert_one(document, *args, **kwargs)
+
+    monkeypatch.setattr(collection, "insert_one", insert_one_atomically)
+    return service
+
+def confirm_in_parallel(service, room_id, date):
+    barrier = Barrier(PARALLEL)
+
+    def confirm(index):
+        client = service.app.test_client()
+        barrier.wait()
+        return client.post("/api/booking/confirm", json={
+            "room_id": room_id,
+            "date": date,
+            "client_name": f"Client {index}",
+            "client_email": f"client{index}@example.com"
+        })
+
+    with ThreadPoolExecutor(max_workers=PARALLEL) as pool:
+        return list(pool.map(confirm, range(PARALLEL)))
+
+def test_exactly_one_parallel_confirm_wins(atomic_inserts):
+    service = atomic_inserts
+    responses = confirm_in_parallel(service, "LON001", "2999-06-15")
+
+    assert Counter(response.status_code for response in responses) == {201: 1, 409: PARALLEL - 1}
+    assert service.bookings_collection.count_documents(
+        {"room_id": "LON001", "date": "2999-06-15", "status": "confirmed"}
+    ) == 1
+
+def test_cancelled_booking_frees_the_date(atomic_inserts):
+    service = atomic_inserts
+    client = service.app.test_client()
+    responses = confirm_in_parallel(service, "MAN002", "2999-07-01")
+    winner = next(response for response in responses if response.status_code == 201)
+
+    assert client.post(f"/api/booking/cancel/{winner.get_json()['booking']['_id']}").status_code == 200
+
+    responses = confirm_in_parallel(service, "MAN002", "2999-07-01")
+    assert Counter(response.status_code for response in responses) == {201: 1, 409: PARALLEL - 1}